@@ -6,21 +6,109 @@ For the Cologne Isthmus Script Project application
 """
 
 import pandas as pd
-import re
 import json
+import os
 from collections import defaultdict, Counter
+from functools import partial
 from itertools import combinations
-import unicodedata
 
-# Load the parsed data
-with open('isthmus_parsed.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+import numpy as np
+
+import alignment
+import columnar
+import correspondences
+import formstore
+import inventories
+import loans
+import parse_isthmus_data
+import rowcache
+import schema
+import segmenter
+import similarity
+import sound_changes
+import wordlist
+from alignment import INDEL_COST, SAME_CLASS_COST, SOUND_CLASSES, SoundClassAligner, alignment_similarity
+from artifacts import ArtifactStore
+from columnar import open_parsed
+from correspondences import POSITIONS, AlignedColumns, aligned_columns, count_correspondences
+from domains import RECONSTRUCTION_CATEGORIES, domain_index
+from formstore import FormStore
+from inventories import build_inventories
+from loans import LOAN_INDEX_FILE, load_loan_index
+from rowcache import RowTable, hash_text, row_key, unique_keys
+from schema import FAMILIES, SCHEMA_VERSION, display_name, languages_in
+from segmenter import LANGUAGE_PROFILES, ORTHOGRAPHY_PROFILES, cache_info
+from similarity import cross_pairs, similar_pairs
+from sound_changes import mine_sound_changes
 
 print("=" * 80)
 print("ADVANCED LINGUISTIC ANALYSIS")
 print("Sound Correspondences & Potential Cognate Detection")
 print("=" * 80)
 
+# Minimum sound-class alignment similarity for a cognate candidate
+SIMILARITY_THRESHOLD = 0.5
+
+# Intermediate results are cached by content hash of their inputs,
+# parameters and code (see artifacts.py); unchanged stages are loaded, not
+# recomputed
+artifacts = ArtifactStore()
+WORDLIST = 'Isthmus_script_languages.csv'
+
+# The parser's exported files, rewritten only when the wordlist or the
+# parser changed (restored from the cache if they were deleted or edited)
+parsed_artifact = artifacts.stage(
+    'parse', lambda: parse_isthmus_data.export(WORDLIST, force=True),
+    inputs=[WORDLIST], params={'schema': SCHEMA_VERSION},
+    outputs=parse_isthmus_data.OUTPUT_FILES,
+    code=[parse_isthmus_data, wordlist, schema, columnar, loans, rowcache])
+
+# Columns of the parsed data (isthmus_parsed.npz); each section reads only
+# the language columns it needs
+parsed = open_parsed('isthmus_parsed.json')
+glosses = list(parsed.glosses)
+
+# Every distinct form segmented once into integer IDs (see formstore.py)
+store_artifact = artifacts.stage(
+    'formstore', lambda: FormStore.from_columns(parsed),
+    inputs=[parsed_artifact],
+    params={'schema': SCHEMA_VERSION, 'orthographies': ORTHOGRAPHY_PROFILES,
+            'profiles': LANGUAGE_PROFILES},
+    code=[formstore, segmenter, columnar])
+store = store_artifact.value
+
+# Focus on Otomanguean languages for internal comparison
+otomanguean_langs = languages_in('Otomanguean')
+
+# Forms already marked as loans (isthmus_loans.json from parse_isthmus_data.py)
+loan_index = load_loan_index('isthmus_parsed.json')
+
+# gloss × language mask of loan forms, left out of the cognate screen
+loan_mask = np.zeros((store.n_glosses, len(store.languages)), dtype=bool)
+if loan_index is not None:
+    loan_entries = defaultdict(list)
+    for lang, entry_id in loan_index.loan_keys():
+        if entry_id is not None and lang in store.lang_index:
+            loan_entries[lang].append(entry_id)
+    for lang, entry_ids in loan_entries.items():
+        loan_mask[:, store.lang_index[lang]] = np.isin(parsed.entry_num, entry_ids) & parsed.present(lang)
+
+# The alignment stages keep their records per gloss (rowcache.RowTable), so
+# after an edit only the glosses whose segmented forms changed are aligned
+# again. Glosses are keyed on their entry number, hashed over their cells.
+gloss_keys = unique_keys(row_key({'id': None if num < 0 else int(num), 'gloss': gloss})
+                         for num, gloss in zip(parsed.entry_num, glosses))
+gloss_hashes = store.gloss_hashes()
+
+def patch_rows(name, params, code, hashes, derive):
+    """Columns of every gloss's records, re-deriving only the glosses whose hash changed"""
+    table = RowTable(os.path.join(artifacts.root, 'rows', name + '.npz'),
+                     version=artifacts.key_for(name, params=params, code=code))
+    stats = table.update(gloss_keys, hashes, derive)
+    table.save()
+    print(f"  {name}: {stats.changed} glosses re-derived, {stats.reused} reused")
+    return table.columns
+
 # ============================================================================
 # 1. DETAILED PHONEME INVENTORY EXTRACTION
 # ============================================================================
@@ -28,72 +116,17 @@ print("\n" + "=" * 80)
 print("1. PHONEME INVENTORY BY LANGUAGE")
 print("=" * 80)
 
-def normalize_form(text):
-    """Normalize a linguistic form for comparison"""
-    if not text:
-        return ''
-    # Remove parenthetical notes
-    text = re.sub(r'\([^)]*\)', '', text)
-    # Remove reconstruction asterisks
-    text = re.sub(r'\*', '', text)
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def extract_phonemes(text):
-    """Extract phonemic segments with diacritics preserved"""
-    if not text:
-        return []
-    
-    text = normalize_form(text)
-    segments = []
-    
-    # Common digraphs/trigraphs in Mesoamerican orthographies
-    digraphs = ['ts', 'tz', 'ch', 'dz', 'gu', 'qu', 'hu', 'ng', 'ñh', 'xh', 
-                'nd', 'mb', 'nh', 'th', 'ph', 'kh', 'tx', 'dj', 'nz', 'ny']
-    
-    i = 0
-    while i < len(text):
-        # Skip non-letter characters but note tone markers
-        if not text[i].isalpha() and text[i] not in "'ʔʼˀ":
-            i += 1
-            continue
-        
-        # Check for digraphs first
-        found_digraph = False
-        for dg in digraphs:
-            if text[i:i+len(dg)].lower() == dg:
-                # Include any following diacritics
-                end = i + len(dg)
-                while end < len(text) and unicodedata.category(text[end]).startswith('M'):
-                    end += 1
-                segments.append(text[i:end].lower())
-                i = end
-                found_digraph = True
-                break
-        
-        if not found_digraph:
-            # Single character with potential combining diacritics
-            char = text[i]
-            end = i + 1
-            while end < len(text) and unicodedata.category(text[end]).startswith('M'):
-                end += 1
-            segments.append(text[i:end].lower())
-            i = end
-    
-    return segments
-
-# Build phoneme inventories
-phoneme_inventories = defaultdict(Counter)
-
-for entry in data['entries']:
-    for lang, form in entry['forms'].items():
-        if form:
-            # Handle multiple forms separated by comma
-            for variant in form.split(','):
-                segments = extract_phonemes(variant)
-                for seg in segments:
-                    phoneme_inventories[lang][seg] += 1
+# Segment, positional and bigram counts of every language in one scan
+# (all comma-separated variants of every form; see inventories.py)
+inventory_counts = artifacts.stage('inventories', lambda: build_inventories(store),
+                                   inputs=[store_artifact], params={'sound_classes': SOUND_CLASSES},
+                                   code=[inventories, alignment]).value
+is_vowel = dict(zip(inventory_counts.segments, inventory_counts.vowels()))
+phoneme_inventories = {}
+for lang in store.languages:
+    inventory = inventory_counts.inventory(lang)
+    if inventory:
+        phoneme_inventories[lang] = Counter(dict(inventory))
 
 # Display inventories
 print("\nConsonant and vowel inventories (frequency > 5):\n")
@@ -102,8 +135,8 @@ for lang in sorted(phoneme_inventories.keys()):
     inventory = phoneme_inventories[lang]
     common_segments = [seg for seg, count in inventory.most_common(50) if count >= 5]
     
-    # Rough categorization
-    vowels = [s for s in common_segments if s[0] in 'aeiouɨɛɔəʌæœøüöä']
+    # Vowels by sound class (alignment.SOUND_CLASSES)
+    vowels = [s for s in common_segments if is_vowel[s]]
     consonants = [s for s in common_segments if s not in vowels]
     
     print(f"\n{lang.upper()}")
@@ -117,49 +150,52 @@ print("\n" + "=" * 80)
 print("2. SOUND CORRESPONDENCES WITHIN OTOMANGUEAN")
 print("=" * 80)
 
-# Focus on Otomanguean languages for internal comparison
-otomanguean_langs = ['otomian', 'trique', 'proto_mixtec', 'Unnamed: 5', 
-                      'zapotec_isthmus', 'Unnamed: 7', 'mazahua']
-
-# Build correspondence pairs
-correspondence_pairs = defaultdict(Counter)
-
-for entry in data['entries']:
-    forms = entry['forms']
-    gloss = entry['gloss']
-    
-    # Get initial segments for each language
-    initial_segments = {}
-    for lang in otomanguean_langs:
-        if lang in forms and forms[lang]:
-            segs = extract_phonemes(forms[lang].split(',')[0])
-            if segs:
-                initial_segments[lang] = segs[0]
-    
-    # Compare pairs
-    for lang1, lang2 in combinations(otomanguean_langs, 2):
-        if lang1 in initial_segments and lang2 in initial_segments:
-            seg1 = initial_segments[lang1]
-            seg2 = initial_segments[lang2]
-            correspondence_pairs[(lang1, lang2)][(seg1, seg2)] += 1
-
-print("\nInitial consonant correspondences (top patterns):\n")
+# Align whole forms of every Otomanguean pair and count aligned segments
+# by position (initial / medial / final in the first language's form)
+oto_pairs = list(combinations([lang for lang in otomanguean_langs if lang in store.lang_index], 2))
+correspondence_params = {'pairs': oto_pairs, 'same_class_cost': SAME_CLASS_COST, 'indel': INDEL_COST,
+                         'sound_classes': SOUND_CLASSES}
+
+def correspondence_columns(rows):
+    """Aligned columns of the given glosses, segments kept as strings"""
+    aligned = aligned_columns(store.subset(rows), oto_pairs)
+    return {'row': rows[aligned.gloss], 'pair': aligned.pair, 'position': aligned.position,
+            'seg_a': store.segments[aligned.seg_a].astype(str),
+            'seg_b': store.segments[aligned.seg_b].astype(str)}
+
+def correspondence_stage():
+    """Correspondence tables from the per-gloss aligned columns"""
+    columns = patch_rows('correspondences', correspondence_params, [correspondences, alignment],
+                         gloss_hashes, correspondence_columns)
+    aligned = AlignedColumns(columns['row'], columns['pair'], columns['position'],
+                             store.segment_ids(columns['seg_a']), store.segment_ids(columns['seg_b']))
+    return count_correspondences(store, oto_pairs, columns=aligned)
+
+correspondence_tables = artifacts.stage(
+    'correspondences', correspondence_stage,
+    inputs=[store_artifact], params=correspondence_params,
+    code=[correspondences, alignment],
+).value
+
+print("\nSegment correspondences from whole-form alignment (top patterns):\n")
 
 # Focus on key pairs
 key_pairs = [
     ('otomian', 'zapotec_isthmus'),
     ('proto_mixtec', 'zapotec_isthmus'),
-    ('trique', 'Unnamed: 5'),
+    ('trique', 'mixtec_tlaxiaco'),
     ('otomian', 'mazahua'),
 ]
 
 for pair in key_pairs:
-    if pair in correspondence_pairs:
-        corr = correspondence_pairs[pair]
+    if pair in oto_pairs:
         print(f"\n{pair[0]} ↔ {pair[1]}:")
-        top_corr = corr.most_common(8)
-        for (seg1, seg2), count in top_corr:
-            if count >= 2:
+        for position in POSITIONS:
+            top_corr = [(segs, count) for segs, count
+                        in correspondence_tables.top(*pair, k=8, position=position) if count >= 2]
+            if top_corr:
+                print(f"  {position}:")
+            for (seg1, seg2), count in top_corr:
                 print(f"    {seg1:6s} : {seg2:6s}  ({count} instances)")
 
 # ============================================================================
@@ -169,70 +205,91 @@ print("\n" + "=" * 80)
 print("3. POTENTIAL COGNATE SETS (Cross-family)")
 print("=" * 80)
 
-def phonetic_similarity(form1, form2):
-    """Calculate rough phonetic similarity between two forms"""
-    if not form1 or not form2:
-        return 0
-    
-    seg1 = set(extract_phonemes(form1))
-    seg2 = set(extract_phonemes(form2))
-    
-    if not seg1 or not seg2:
-        return 0
-    
-    intersection = len(seg1 & seg2)
-    union = len(seg1 | seg2)
-    
-    return intersection / union if union > 0 else 0
-
 # Look for potential cognates between families
 print("\nHigh-similarity forms between language families:\n")
 
-mixe_zoque = ['popoluca']
-totonacan = ['totonac']
-huavean = ['huave']
-chontal_fam = ['chontal']
-
-family_pairs = [
-    ('Otomanguean', otomanguean_langs, 'Mixe-Zoquean', mixe_zoque),
-    ('Otomanguean', otomanguean_langs, 'Totonacan', totonacan),
-    ('Mixe-Zoquean', mixe_zoque, 'Totonacan', totonacan),
-]
-
-potential_cognates = []
-
-for entry in data['entries']:
-    forms = entry['forms']
-    gloss = entry['gloss']
-    
-    # Check Popoluca vs Otomanguean (potential loans or cognates)
-    if 'popoluca' in forms:
-        pop_form = forms['popoluca']
-        for oto_lang in ['zapotec_isthmus', 'otomian', 'proto_mixtec']:
-            if oto_lang in forms:
-                oto_form = forms[oto_lang]
-                sim = phonetic_similarity(pop_form, oto_form)
-                if sim > 0.4:
-                    potential_cognates.append({
-                        'gloss': gloss,
-                        'popoluca': pop_form,
-                        oto_lang: oto_form,
-                        'similarity': sim
-                    })
-
-# Display potential cognates/loans
-print("Popoluca ↔ Otomanguean (possible loans/cognates):\n")
-seen_glosses = set()
-for item in sorted(potential_cognates, key=lambda x: -x['similarity'])[:15]:
-    if item['gloss'] not in seen_glosses:
+language_families = {family: languages_in(family) for family in FAMILIES}
+family_of = {lang: family for family, langs in language_families.items() for lang in langs}
+
+# Every pair of families, every language pair across them
+family_pairs = [(fam1, langs1, fam2, langs2)
+                for (fam1, langs1), (fam2, langs2) in combinations(language_families.items(), 2)]
+screen_pairs = cross_pairs(family_pairs, store.languages)
+
+if loan_index is not None:
+    print(f"Excluding {len(loan_index.loan_keys())} forms marked as loans\n")
+
+screen_params = {'pairs': screen_pairs, 'threshold': SIMILARITY_THRESHOLD,
+                 'same_class_cost': SAME_CLASS_COST, 'indel': INDEL_COST,
+                 'sound_classes': SOUND_CLASSES}
+# cognate_screen() itself is defined in this script
+screen_code = [__file__, similarity, alignment]
+
+def cognate_screen():
+    """Alignment-similarity screen over all cross-family pairs"""
+    pair_index = {pair: p for p, pair in enumerate(screen_pairs)}
+    aligners = []
+
+    def screen_hits(rows):
+        subset = store.subset(rows)
+        aligners.append(SoundClassAligner(subset))
+        hits = list(similar_pairs(subset, screen_pairs, SIMILARITY_THRESHOLD,
+                                  exclude=loan_mask[rows],
+                                  measure=partial(alignment_similarity, aligner=aligners[-1])))
+        return {'row': rows[[hit.gloss for hit in hits]].astype(np.int64),
+                'pair': np.array([pair_index[(hit.lang1, hit.lang2)] for hit in hits], dtype=np.int64),
+                'similarity': np.array([hit.similarity for hit in hits], dtype=float)}
+
+    # A gloss's hits also change when its loan marks do
+    hashes = [hash_text(digest + loans.tobytes().hex()) for digest, loans in zip(gloss_hashes, loan_mask)]
+    hits = patch_rows('cognate_screen', screen_params, screen_code, hashes, screen_hits)
+    candidates = []
+    for row, p, sim in zip(hits['row'], hits['pair'], hits['similarity']):
+        lang1, lang2 = screen_pairs[p]
+        candidates.append({
+            'gloss': store.glosses[row],
+            'family1': family_of[lang1],
+            'lang1': lang1,
+            'form1': parsed.column(lang1)[row],
+            'family2': family_of[lang2],
+            'lang2': lang2,
+            'form2': parsed.column(lang2)[row],
+            'similarity': float(sim),
+        })
+    aligned = sum(aligner.pairs_aligned for aligner in aligners)
+    seconds = sum(aligner.seconds for aligner in aligners)
+    return {'candidates': candidates, 'alignments': aligned,
+            'pairs_per_second': aligned / seconds if seconds else 0.0}
+
+screen = artifacts.stage(
+    'cognate_screen', cognate_screen,
+    inputs=[store_artifact, LOAN_INDEX_FILE], params=screen_params, code=screen_code,
+).value
+potential_cognates = screen['candidates']
+
+print(f"{len(potential_cognates)} form pairs above {SIMILARITY_THRESHOLD} "
+      f"across {len(screen_pairs)} language pairs")
+print(f"({screen['alignments']} alignments, {screen['pairs_per_second']:,.0f} pairs/s)\n")
+
+# Display the strongest candidates for each family pair
+for fam1, _, fam2, _ in family_pairs:
+    candidates = [item for item in potential_cognates
+                  if (item['family1'], item['family2']) == (fam1, fam2)]
+    if not candidates:
+        continue
+    print(f"{fam1} ↔ {fam2} (possible loans/cognates):\n")
+    seen_glosses = set()
+    for item in sorted(candidates, key=lambda x: -x['similarity']):
+        if item['gloss'] in seen_glosses:
+            continue
         print(f"  '{item['gloss']}'")
-        print(f"    Popoluca: {item.get('popoluca', 'N/A')}")
-        for lang in ['zapotec_isthmus', 'otomian', 'proto_mixtec']:
-            if lang in item:
-                print(f"    {lang}: {item[lang]}")
+        print(f"    {item['lang1']}: {item['form1']}")
+        print(f"    {item['lang2']}: {item['form2']}")
         print(f"    Similarity: {item['similarity']:.2f}")
         print()
         seen_glosses.add(item['gloss'])
+        if len(seen_glosses) == 5:
+            break
 
 # ============================================================================
 # 4. PROTO-MIXTEC FORM ANALYSIS
@@ -242,23 +299,20 @@ print("4. PROTO-MIXTEC RECONSTRUCTION ANALYSIS")
 print("=" * 80)
 
 proto_mixtec_entries = []
-for entry in data['entries']:
-    if 'proto_mixtec' in entry['forms']:
-        proto_mixtec_entries.append({
-            'gloss': entry['gloss'],
-            'proto_form': entry['forms']['proto_mixtec'],
-            'trique': entry['forms'].get('trique', ''),
-            'mixtec_daughter': entry['forms'].get('Unnamed: 5', '')
-        })
+proto_forms, trique_forms, daughter_forms = (
+    parsed.column(lang) for lang in ('proto_mixtec', 'trique', 'mixtec_tlaxiaco'))
+for row in np.flatnonzero(parsed.present('proto_mixtec')):
+    proto_mixtec_entries.append({
+        'gloss': glosses[row],
+        'proto_form': proto_forms[row],
+        'trique': trique_forms[row],
+        'mixtec_daughter': daughter_forms[row]
+    })
 
 print(f"\nTotal Proto-Mixtec reconstructions: {len(proto_mixtec_entries)}")
 
 # Analyze proto-Mixtec phoneme patterns
-proto_phonemes = Counter()
-for entry in proto_mixtec_entries:
-    segs = extract_phonemes(entry['proto_form'])
-    for seg in segs:
-        proto_phonemes[seg] += 1
+proto_phonemes = Counter(dict(inventory_counts.inventory('proto_mixtec')))
 
 print("\nProto-Mixtec phoneme frequency:")
 print("-" * 40)
@@ -266,27 +320,29 @@ for phoneme, count in proto_phonemes.most_common(25):
     bar = '█' * (count // 2)
     print(f"  {phoneme:6s} : {count:3d} {bar}")
 
-# Identify systematic sound changes Proto-Mixtec → daughter languages
-print("\nSound changes: Proto-Mixtec → Tlaxiaco/Putla Mixtec")
-print("-" * 50)
-
-pm_to_daughter = defaultdict(Counter)
-for entry in proto_mixtec_entries:
-    pm_segs = extract_phonemes(entry['proto_form'])
-    da_segs = extract_phonemes(entry['mixtec_daughter'])
-    
-    # Align by position (simplified)
-    for i, pm_seg in enumerate(pm_segs[:min(3, len(pm_segs))]):
-        if i < len(da_segs):
-            pm_to_daughter[pm_seg][da_segs[i]] += 1
-
-print("\nInitial position correspondences:")
-for pm_seg in sorted(pm_to_daughter.keys()):
-    correspondences = pm_to_daughter[pm_seg]
-    if correspondences.total() >= 3:
-        top_corr = correspondences.most_common(3)
-        corr_str = ', '.join([f"{seg}({n})" for seg, n in top_corr])
-        print(f"  *{pm_seg} → {corr_str}")
+# Sound changes Proto-Mixtec → daughter languages, from whole-form alignments
+# of every reconstruction with each daughter (see sound_changes.py)
+SOUND_CHANGE_DAUGHTERS = ['mixtec_tlaxiaco', 'trique']
+sound_change_table = artifacts.stage(
+    'sound_changes',
+    lambda: mine_sound_changes(store, 'proto_mixtec', SOUND_CHANGE_DAUGHTERS),
+    inputs=[store_artifact],
+    params={'daughters': SOUND_CHANGE_DAUGHTERS, 'same_class_cost': SAME_CLASS_COST,
+            'indel': INDEL_COST, 'sound_classes': SOUND_CLASSES},
+    code=[sound_changes, correspondences, alignment]).value
+print(f"\n({sound_change_table.alignments} reconstruction × daughter alignments)")
+sound_change_rules = sound_change_table.rules(min_support=2)
+
+for daughter in SOUND_CHANGE_DAUGHTERS:
+    print(f"\nSound changes: Proto-Mixtec → {display_name(daughter)}")
+    print("-" * 50)
+    rules = [r for r in sound_change_rules if r.daughter == daughter]
+    print("  Regular correspondences (support ≥ 3):")
+    for rule in [r for r in rules if not r.environment and r.support >= 3][:15]:
+        print(f"    {str(rule):22s} {rule.support:3d}/{rule.total:<3d} ({rule.reliability:.0%})")
+    print("  Conditioned changes:")
+    for rule in [r for r in rules if r.environment][:10]:
+        print(f"    {str(rule):22s} {rule.support:3d}/{rule.total:<3d} ({rule.reliability:.0%})")
 
 # ============================================================================
 # 5. SEMANTIC FIELD ANALYSIS FOR RECONSTRUCTION
@@ -297,28 +353,16 @@ print("=" * 80)
 
 semantic_coverage = defaultdict(lambda: defaultdict(int))
 
-# Define expanded semantic categories
-categories = {
-    'basic_vocabulary': ['I', 'you', 'we', 'this', 'that', 'what', 'who', 'not', 'all'],
-    'numerals': ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten'],
-    'body_parts': ['head', 'eye', 'ear', 'nose', 'mouth', 'hand', 'foot', 'heart', 'blood', 'bone'],
-    'nature': ['sun', 'moon', 'star', 'water', 'fire', 'stone', 'tree', 'earth', 'rain'],
-    'animals': ['dog', 'fish', 'bird', 'snake', 'deer'],
-    'kinship': ['mother', 'father', 'man', 'woman', 'child'],
-    'colors': ['red', 'white', 'black', 'green', 'yellow'],
-    'actions': ['eat', 'drink', 'sleep', 'die', 'see', 'hear', 'come', 'go']
-}
+# Expanded semantic categories (domains.RECONSTRUCTION_CATEGORIES), tagged
+# with the same whole-word matcher the parser report uses
+categories = RECONSTRUCTION_CATEGORIES
+category_index = domain_index(glosses, categories)
+forms_per_gloss = sum(parsed.present(lang).astype(int) for lang in parsed.languages)
 
-for entry in data['entries']:
-    gloss_lower = entry['gloss'].lower()
-    num_forms = len(entry['forms'])
-    
-    for category, keywords in categories.items():
-        for kw in keywords:
-            if kw in gloss_lower:
-                semantic_coverage[category]['total'] += 1
-                semantic_coverage[category]['forms'] += num_forms
-                break
+for i, num_forms in enumerate(forms_per_gloss):
+    for category in category_index.domains_of(i):
+        semantic_coverage[category]['total'] += 1
+        semantic_coverage[category]['forms'] += int(num_forms)
 
 print("\nSemantic field coverage (for comparative reconstruction):\n")
 print(f"{'Category':<20s} {'Entries':>8s} {'Total Forms':>12s} {'Avg Forms/Entry':>16s}")
@@ -341,6 +385,7 @@ analysis_summary = {
     'phoneme_inventories': {lang: dict(inv.most_common(50)) 
                            for lang, inv in phoneme_inventories.items()},
     'proto_mixtec_phonemes': dict(proto_phonemes.most_common()),
+    'sound_changes': [dict(rule._asdict(), rule=str(rule)) for rule in sound_change_rules],
     'potential_cognates': potential_cognates[:20],
     'semantic_coverage': {k: dict(v) for k, v in semantic_coverage.items()}
 }
@@ -360,6 +405,11 @@ pm_df = pd.DataFrame(proto_mixtec_entries)
 pm_df.to_csv('proto_mixtec_analysis.csv', index=False, encoding='utf-8')
 print("  ✓ Saved: proto_mixtec_analysis.csv")
 
+seg_cache = cache_info()
+print(f"  Segmentation cache: {seg_cache.hits} hits, {seg_cache.misses} misses "
+      f"({seg_cache.size} forms cached)")
+artifacts.report()
+
 print("\n" + "=" * 80)
 print("ANALYSIS COMPLETE")
 print("=" * 80)
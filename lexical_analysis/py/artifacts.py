@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Analysis Artifact Store
+=======================
+Content-addressed cache for the intermediate results of the pipeline.
+
+A stage declares its inputs (files, or artifacts of earlier stages), its
+parameters and the code it runs (modules or source files). Their hashes,
+together with the stage name, form the stage key, so editing a stage's
+code invalidates it like changing an input. The code hashed is each
+listed file plus every module from the same directory that it imports,
+directly or through other such modules (code_files), so a list naming
+only the stage's entry module still covers its helpers. The stage's
+return value is pickled under the key, and any files the stage writes
+(`outputs`) are copied next to it. Running the stage again with the same
+key loads the value and restores the files instead of recomputing. Since a downstream stage's key includes the keys
+of the artifacts it consumes, changing a parameter of a late stage only
+recomputes that stage and whatever depends on it.
+
+    store = ArtifactStore()
+    forms = store.stage('formstore', build_store, inputs=['isthmus_parsed.json'],
+                        code=[formstore, segmenter])
+    screen = store.stage('cognate_screen', screen_fn, inputs=[forms],
+                         params={'threshold': 0.5}, code=[similarity, alignment])
+    store.report()
+
+File inputs are hashed by content; digests are remembered per (path,
+size, mtime) so unchanged files are not re-read on every run.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import time
+from functools import lru_cache
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+ARTIFACT_DIR = '.isthmus_artifacts'
+DIGEST_FILE = 'file_digests.json'
+
+
+class Artifact(NamedTuple):
+    name: str
+    key: str
+    value: Any
+
+
+class StageRecord(NamedTuple):
+    name: str
+    key: str
+    hit: bool
+    seconds: float
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _parsed_imports(path: str, size: int, mtime_ns: int) -> Tuple[str, ...]:
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module.split('.')[0])
+    return tuple(names)
+
+
+def _imported_modules(path: str) -> Tuple[str, ...]:
+    """Top-level names of the modules a source file imports (anywhere in the file)"""
+    stat = os.stat(path)
+    return _parsed_imports(path, stat.st_size, stat.st_mtime_ns)
+
+
+def code_files(code: Iterable[Union[str, ModuleType]]) -> List[str]:
+    """Source files of `code` and, transitively, of the modules beside them that they import"""
+    pending = [os.path.abspath(item if isinstance(item, str) else inspect.getsourcefile(item))
+               for item in code]
+    found = set()
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        if not os.path.exists(path):
+            continue
+        for name in _imported_modules(path):
+            local = os.path.join(os.path.dirname(path), name + '.py')
+            if os.path.exists(local):
+                pending.append(local)
+    return sorted(found, key=lambda path: (os.path.basename(path), path))
+
+
+class ArtifactStore:
+    """Stage results and output files keyed by a hash of inputs and parameters"""
+
+    def __init__(self, root: str = ARTIFACT_DIR, keep: int = 4):
+        self.root = root
+        self.keep = keep
+        self.records: List[StageRecord] = []
+        os.makedirs(root, exist_ok=True)
+        self._digest_path = os.path.join(root, DIGEST_FILE)
+        self._digests = {}
+        if os.path.exists(self._digest_path):
+            with open(self._digest_path, 'r', encoding='utf-8') as f:
+                self._digests = json.load(f)
+
+    def file_digest(self, path: str) -> str:
+        """Content hash of a file ('missing' if it does not exist)"""
+        if not os.path.exists(path):
+            return 'missing'
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        cached = self._digests.get(os.path.abspath(path))
+        if cached is not None and cached[:2] == stamp:
+            return cached[2]
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        self._digests[os.path.abspath(path)] = stamp + [digest]
+        with open(self._digest_path, 'w', encoding='utf-8') as f:
+            json.dump(self._digests, f)
+        return digest
+
+    def key_for(self, name: str, inputs: Iterable[Union[str, Artifact]] = (),
+                params: Optional[Dict] = None,
+                code: Iterable[Union[str, ModuleType]] = ()) -> str:
+        parts = []
+        for item in inputs:
+            if isinstance(item, Artifact):
+                parts.append(['artifact', item.name, item.key])
+            else:
+                parts.append(['file', os.path.basename(item), self.file_digest(item)])
+        for path in code_files(code):
+            parts.append(['code', os.path.basename(path), self.file_digest(path)])
+        payload = json.dumps([name, parts, params or {}], sort_keys=True, default=repr,
+                             ensure_ascii=False)
+        return _sha1(payload.encode('utf-8'))[:16]
+
+    def _stage_dir(self, name: str, key: str) -> str:
+        return os.path.join(self.root, name, key)
+
+    def stage(self, name: str, fn: Callable[[], Any], inputs: Sequence[Union[str, Artifact]] = (),
+              params: Optional[Dict] = None, outputs: Sequence[str] = (),
+              code: Sequence[Union[str, ModuleType]] = ()) -> Artifact:
+        """Return the cached result of `fn` for these inputs/params/code, computing it on a miss"""
+        start = time.perf_counter()
+        key = self.key_for(name, inputs, params, code)
+        stage_dir = self._stage_dir(name, key)
+        value_path = os.path.join(stage_dir, 'value.pkl')
+
+        if os.path.exists(value_path):
+            with open(value_path, 'rb') as f:
+                value = pickle.load(f)
+            for path in outputs:
+                cached = os.path.join(stage_dir, 'files', os.path.basename(path))
+                if self.file_digest(path) != self.file_digest(cached):
+                    shutil.copy2(cached, path)
+            self.records.append(StageRecord(name, key, True, time.perf_counter() - start))
+            return Artifact(name, key, value)
+
+        value = fn()
+        tmp_dir = stage_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(os.path.join(tmp_dir, 'files'))
+        for path in outputs:
+            shutil.copy2(path, os.path.join(tmp_dir, 'files', os.path.basename(path)))
+        with open(os.path.join(tmp_dir, 'value.pkl'), 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        os.replace(tmp_dir, stage_dir)
+        self._prune(name, key)
+        self.records.append(StageRecord(name, key, False, time.perf_counter() - start))
+        return Artifact(name, key, value)
+
+    def _prune(self, name: str, current: str):
+        """Keep only the `keep` most recently written keys of a stage"""
+        stage_root = os.path.join(self.root, name)
+        keys = [k for k in os.listdir(stage_root) if not k.endswith('.tmp')]
+        keys.sort(key=lambda k: os.path.getmtime(os.path.join(stage_root, k)), reverse=True)
+        for old in keys[self.keep:]:
+            if old != current:
+                shutil.rmtree(os.path.join(stage_root, old), ignore_errors=True)
+
+    def report(self):
+        """Print which stages were cache hits and which were recomputed"""
+        print("\nArtifact cache:")
+        for record in self.records:
+            status = 'hit' if record.hit else 'recomputed'
+            print(f"  {record.name:24s} {status:10s} {record.seconds * 1000:8.1f} ms  [{record.key}]")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Columnar Wordlist Export
+========================
+Binary, column-oriented companion to isthmus_parsed.json.
+
+isthmus_parsed.npz stores the gloss × language table as one column per
+language, each dictionary-encoded:
+
+    forms/<lang>/codes     int32, one per gloss (-1 = no form)
+    forms/<lang>/vocab     UTF-8 bytes of the distinct forms, concatenated
+    forms/<lang>/offsets   int32 boundaries of each form in vocab
+
+plus the gloss column (encoded the same way), entry numbers and the
+non-entry parts of the JSON (metadata, completeness). Members of an .npz
+archive are only read when accessed, so a loader that asks for three
+languages never decodes the other columns. Consumers work on the columns
+directly (FormStore.from_columns, PresenceMatrix.from_columns) rather than
+on a rebuilt entries list:
+
+    with open_parsed('isthmus_parsed.json') as parsed:
+        store = FormStore.from_columns(parsed)
+
+Columns are exposed under their schema variety IDs; files written before
+the schema registry (with 'Unnamed: <n>' keys) are mapped on load.
+"""
+
+import io
+import json
+import os
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from schema import canonical_id, check_languages
+from wordlist import Entry
+
+COLUMNAR_FILE = 'isthmus_parsed.npz'
+
+
+def _encode(values: Sequence[str]):
+    """Dictionary-encode a column of strings ('' -> code -1)"""
+    vocab = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        if value:
+            codes[i] = vocab.setdefault(value, len(vocab))
+        else:
+            codes[i] = -1
+    encoded = [value.encode('utf-8') for value in vocab]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return codes, blob, offsets
+
+
+def _decode_vocab(blob: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    data = blob.tobytes()
+    return np.array([data[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])],
+                    dtype=object)
+
+
+def write_columnar(path, entries: Iterable, languages: Sequence[str],
+                   header: Optional[Dict] = None):
+    """
+    Write entries (Entry records) as isthmus_parsed.npz (a path or a binary
+    file object). `header` holds the non-entry keys of isthmus_parsed.json
+    ('metadata', 'completeness').
+    """
+    entries = list(entries)
+    arrays = {
+        'languages': np.array(languages, dtype=str),
+        'entry_num': np.array([-1 if e.entry_num is None else e.entry_num for e in entries],
+                              dtype=np.int32),
+        'header_json': np.array(json.dumps(header or {}, ensure_ascii=False)),
+    }
+    columns = [('gloss', [e.gloss for e in entries])]
+    columns += [(f'forms/{lang}', [e.forms.get(lang, '') for e in entries]) for lang in languages]
+    for key, values in columns:
+        codes, blob, offsets = _encode(values)
+        arrays[f'{key}/codes'] = codes
+        arrays[f'{key}/vocab'] = blob
+        arrays[f'{key}/offsets'] = offsets
+    np.savez(path, **arrays)
+
+
+class ColumnarWordlist:
+    """Read-only view of isthmus_parsed.npz that loads language columns on demand"""
+
+    def __init__(self, path=COLUMNAR_FILE):
+        self.path = path
+        self._npz = np.load(path, allow_pickle=False)
+        stored = [str(lang) for lang in self._npz['languages']]
+        self.languages = [canonical_id(lang) for lang in stored]
+        self._stored = dict(zip(self.languages, stored))
+        self.entry_num = self._npz['entry_num']
+        self.header = json.loads(str(self._npz['header_json']))
+        self._columns = {}
+        self._codes = {}
+
+    @classmethod
+    def from_entries(cls, entries: Iterable, languages: Sequence[str],
+                     header: Optional[Dict] = None) -> 'ColumnarWordlist':
+        """Columns of entries (Entry records) encoded in memory, e.g. straight from the CSV"""
+        buffer = io.BytesIO()
+        write_columnar(buffer, entries, languages, header)
+        buffer.seek(0)
+        return cls(buffer)
+
+    def __len__(self) -> int:
+        return len(self.entry_num)
+
+    def close(self):
+        self._npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _decoded(self, key: str) -> np.ndarray:
+        if key not in self._columns:
+            codes = self._member_codes(key)
+            vocab = _decode_vocab(self._npz[f'{key}/vocab'], self._npz[f'{key}/offsets'])
+            # Append '' so code -1 decodes to an empty string
+            table = np.append(vocab, '')
+            self._columns[key] = table[codes]
+        return self._columns[key]
+
+    def _member_codes(self, key: str) -> np.ndarray:
+        if key not in self._codes:
+            self._codes[key] = self._npz[f'{key}/codes']
+        return self._codes[key]
+
+    @property
+    def glosses(self) -> np.ndarray:
+        return self._decoded('gloss')
+
+    def codes(self, lang: str) -> np.ndarray:
+        """Dictionary codes of one language column (-1 = no form)"""
+        return self._member_codes(f'forms/{self._stored[canonical_id(lang)]}')
+
+    def present(self, lang: str) -> np.ndarray:
+        """Boolean mask of the glosses with a form in one language"""
+        return self.codes(lang) >= 0
+
+    def vocab(self, lang: str) -> np.ndarray:
+        """Distinct forms of one language, indexed by code"""
+        key = f'forms/{self._stored[canonical_id(lang)]}'
+        return _decode_vocab(self._npz[f'{key}/vocab'], self._npz[f'{key}/offsets'])
+
+    def column(self, lang: str) -> np.ndarray:
+        """Decoded forms of one language ('' where the gloss has no form)"""
+        lang = check_languages([lang], self.languages)[0]
+        return self._decoded(f'forms/{self._stored[lang]}')
+
+
+def open_parsed(json_path: str = 'isthmus_parsed.json') -> ColumnarWordlist:
+    """
+    Columns of the parsed wordlist: the columnar export when it is at least
+    as new as the JSON, otherwise the JSON encoded in memory
+    """
+    npz_path = os.path.join(os.path.dirname(json_path), COLUMNAR_FILE)
+    use_npz = os.path.exists(npz_path) and (
+        not os.path.exists(json_path)
+        or os.path.getmtime(npz_path) >= os.path.getmtime(json_path))
+    if use_npz:
+        return ColumnarWordlist(npz_path)
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    languages = [canonical_id(lang) for lang in data['metadata']['languages']]
+    entries = [Entry(entry['id'], entry['gloss'], {canonical_id(k): v for k, v in entry['forms'].items()})
+               for entry in data.pop('entries')]
+    return ColumnarWordlist.from_entries(entries, languages, data)
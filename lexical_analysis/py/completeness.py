@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Wordlist Completeness
+=====================
+One boolean presence matrix (glosses × varieties) for the comparative
+wordlist, built in a single pass. Every coverage figure used by the
+parser report and the Swadesh notebook is derived from it:
+
+- per-language and per-family coverage
+- pairwise co-coverage (glosses attested in both languages)
+- per-gloss coverage (how many varieties attest each gloss)
+
+presence_matrix() caches the matrix per wordlist file, so the report
+sections and the notebook heatmap share one scan.
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from wordlist import WordlistLoader
+
+
+def flatten_families(families: Dict) -> Dict[str, List[str]]:
+    """Collapse {family: {branch: [langs]}} groupings into {family: [langs]}"""
+    flat = {}
+    for family, members in families.items():
+        if isinstance(members, dict):
+            flat[family] = [lang for langs in members.values() for lang in langs]
+        else:
+            flat[family] = list(members)
+    return flat
+
+
+class PresenceMatrix:
+    """Boolean matrix of attested forms, rows = glosses, columns = languages"""
+
+    def __init__(self, glosses: Sequence[str], languages: Sequence[str], present: np.ndarray):
+        self.glosses = list(glosses)
+        self.languages = list(languages)
+        self.present = np.asarray(present, dtype=bool)
+        self._index = {lang: j for j, lang in enumerate(self.languages)}
+
+    @classmethod
+    def from_entries(cls, entries: Iterable, languages: Sequence[str]) -> 'PresenceMatrix':
+        """Build from Entry records (or anything with .gloss and .forms)"""
+        languages = list(languages)
+        glosses = []
+
+        def cells():
+            for entry in entries:
+                glosses.append(entry.gloss)
+                forms = entry.forms
+                for lang in languages:
+                    yield bool(forms.get(lang, '').strip())
+
+        flat = np.fromiter(cells(), dtype=bool)
+        return cls(glosses, languages, flat.reshape(-1, len(languages)))
+
+    @classmethod
+    def from_json(cls, data: Dict, languages: Optional[Sequence[str]] = None) -> 'PresenceMatrix':
+        """Build from the isthmus_parsed.json structure"""
+        if languages is None:
+            languages = data['metadata']['languages']
+        entries = data['entries']
+        glosses = [entry['gloss'] for entry in entries]
+        flat = np.fromiter(
+            (bool(entry['forms'].get(lang, '').strip()) for entry in entries for lang in languages),
+            dtype=bool, count=len(entries) * len(languages))
+        return cls(glosses, languages, flat.reshape(len(entries), len(languages)))
+
+    @classmethod
+    def from_columns(cls, wordlist, languages: Optional[Sequence[str]] = None) -> 'PresenceMatrix':
+        """Build from a ColumnarWordlist (columnar.py), reading only the code columns"""
+        languages = list(wordlist.languages if languages is None else languages)
+        present = np.column_stack([wordlist.present(lang) for lang in languages])
+        return cls(list(wordlist.glosses), languages, present)
+
+    @property
+    def n_glosses(self) -> int:
+        return self.present.shape[0]
+
+    def column(self, lang: str) -> np.ndarray:
+        """Presence vector of one language"""
+        return self.present[:, self._index[lang]]
+
+    def language_counts(self) -> Dict[str, int]:
+        """Number of attested forms per language"""
+        counts = self.present.sum(axis=0)
+        return {lang: int(n) for lang, n in zip(self.languages, counts)}
+
+    def language_coverage(self) -> Dict[str, float]:
+        """Percentage of glosses attested per language"""
+        if not self.n_glosses:
+            return {lang: 0.0 for lang in self.languages}
+        pct = self.present.mean(axis=0) * 100
+        return {lang: float(p) for lang, p in zip(self.languages, pct)}
+
+    def family_coverage(self, families: Dict, how: str = 'any') -> Dict[str, float]:
+        """
+        Percentage coverage per family.
+
+        how='any' counts a gloss as covered if any member attests it;
+        how='mean' averages the member languages' own coverage.
+        """
+        coverage = {}
+        for family, members in flatten_families(families).items():
+            cols = [self._index[m] for m in members if m in self._index]
+            if not cols or not self.n_glosses:
+                coverage[family] = 0.0
+            elif how == 'any':
+                coverage[family] = float(self.present[:, cols].any(axis=1).mean() * 100)
+            elif how == 'mean':
+                coverage[family] = float(self.present[:, cols].mean() * 100)
+            else:
+                raise ValueError(f"unknown family coverage mode: {how!r}")
+        return coverage
+
+    def co_coverage(self) -> np.ndarray:
+        """Languages × languages count of glosses attested in both"""
+        m = self.present.astype(np.int32)
+        return m.T @ m
+
+    def gloss_coverage(self) -> np.ndarray:
+        """Number of languages attesting each gloss"""
+        return self.present.sum(axis=1)
+
+
+@lru_cache(maxsize=8)
+def _cached_matrix(path: str, mtime: float, languages: Optional[tuple]) -> PresenceMatrix:
+    loader = WordlistLoader(path)
+    langs = loader.languages if languages is None else list(languages)
+    return PresenceMatrix.from_entries(loader.entries(langs), langs)
+
+
+def presence_matrix(path: str = 'Isthmus_script_languages.csv',
+                    languages: Optional[Sequence[str]] = None) -> PresenceMatrix:
+    """Presence matrix for a wordlist CSV, cached until the file changes"""
+    path = os.path.abspath(path)
+    langs = None if languages is None else tuple(languages)
+    return _cached_matrix(path, os.path.getmtime(path), langs)
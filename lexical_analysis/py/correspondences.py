@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Sound Correspondence Tables
+===========================
+Segment-by-segment correspondences between language columns, counted
+from whole-form alignments.
+
+For every language pair the first variant of each shared gloss is aligned
+with the sound-class aligner (alignment.py) and each aligned, non-gap
+column adds one count to a sparse segment × segment matrix. Counts are
+kept separately for the position of the segment in the first language's
+form: initial, medial or final (a one-segment form counts as initial).
+
+All pairs are aligned in one batch and all counts accumulated with one
+np.unique over packed (pair, position, segment, segment) keys, so tables
+for dozens of varieties come out of a single pass. The aligned columns
+themselves (aligned_columns) can be kept per gloss and counted later, so a
+caller can re-align only the glosses that changed.
+"""
+
+from itertools import combinations
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from alignment import SoundClassAligner
+from formstore import FormStore
+
+POSITIONS = ('initial', 'medial', 'final')
+
+
+class AlignedColumns(NamedTuple):
+    """One record per aligned, non-gap column"""
+    gloss: np.ndarray     # gloss row of the aligned forms
+    pair: np.ndarray      # index into the pair list
+    position: np.ndarray  # index into POSITIONS
+    seg_a: np.ndarray     # segment ID in the first language
+    seg_b: np.ndarray     # segment ID in the second language
+
+
+def first_variants(store: FormStore, lang: str) -> np.ndarray:
+    """Variant row of each gloss's first non-empty variant (-1 if none)"""
+    n_langs = len(store.languages)
+    out = np.full(store.n_glosses, -1, dtype=np.int64)
+    lang_idx = store.lang_index[lang]
+    for g in range(store.n_glosses):
+        c = g * n_langs + lang_idx
+        for v in range(store.cell_offsets[c], store.cell_offsets[c + 1]):
+            if store.offsets[v + 1] > store.offsets[v]:
+                out[g] = v
+                break
+    return out
+
+
+class CorrespondenceTables:
+    """Sparse segment × segment counts per language pair and position class"""
+
+    def __init__(self, store: FormStore, pairs: Sequence[Tuple[str, str]],
+                 matrices: Dict[Tuple[str, str, str], sparse.csr_matrix]):
+        self.store = store
+        self.pairs = list(pairs)
+        self.matrices = matrices
+
+    def matrix(self, lang1: str, lang2: str, position: Optional[str] = None) -> sparse.csr_matrix:
+        """Counts for one pair (rows: lang1 segments, columns: lang2 segments), all positions by default"""
+        if (lang1, lang2) not in self.pairs and (lang2, lang1) in self.pairs:
+            return self.matrix(lang2, lang1, position).T.tocsr()
+        positions = POSITIONS if position is None else (position,)
+        return sum(self.matrices[(lang1, lang2, pos)] for pos in positions)
+
+    def top(self, lang1: str, lang2: str, k: int = 8, position: Optional[str] = None
+            ) -> List[Tuple[Tuple[str, str], int]]:
+        """The k most frequent correspondences of a pair as ((seg1, seg2), count)"""
+        coo = self.matrix(lang1, lang2, position).tocoo()
+        order = np.lexsort((coo.col, coo.row, -coo.data))[:k]
+        return [((self.store.segments[coo.row[i]], self.store.segments[coo.col[i]]), int(coo.data[i]))
+                for i in order]
+
+
+def aligned_columns(store: FormStore, pairs: Sequence[Tuple[str, str]],
+                    aligner: Optional[SoundClassAligner] = None) -> AlignedColumns:
+    """Align the first variants of every shared gloss of every pair"""
+    pairs = list(pairs)
+    aligner = aligner or SoundClassAligner(store)
+    first = {lang: first_variants(store, lang) for pair in pairs for lang in pair}
+
+    rows_a, rows_b, pair_of, gloss_of = [], [], [], []
+    for p, (lang1, lang2) in enumerate(pairs):
+        both = (first[lang1] >= 0) & (first[lang2] >= 0)
+        rows_a.append(first[lang1][both])
+        rows_b.append(first[lang2][both])
+        pair_of.append(np.full(both.sum(), p, dtype=np.int64))
+        gloss_of.append(np.flatnonzero(both))
+    empty = np.zeros(0, dtype=np.int64)
+    rows_a = np.concatenate(rows_a) if pairs else empty
+    rows_b = np.concatenate(rows_b) if pairs else empty
+    pair_of = np.concatenate(pair_of) if pairs else empty
+    gloss_of = np.concatenate(gloss_of) if pairs else empty
+
+    k, i, seg_a, seg_b = aligner.aligned_segments(rows_a, rows_b)
+    length = (store.offsets[rows_a + 1] - store.offsets[rows_a])[k]
+    position = np.where(i == 0, 0, np.where(i == length - 1, 2, 1))
+    return AlignedColumns(gloss_of[k], pair_of[k], position, seg_a, seg_b)
+
+
+def count_correspondences(store: FormStore, pairs: Optional[Sequence[Tuple[str, str]]] = None,
+                          aligner: Optional[SoundClassAligner] = None,
+                          columns: Optional[AlignedColumns] = None) -> CorrespondenceTables:
+    """Count correspondences of every pair (all pairs by default), aligning unless columns are given"""
+    if pairs is None:
+        pairs = list(combinations(store.languages, 2))
+    pairs = list(pairs)
+    if columns is None:
+        columns = aligned_columns(store, pairs, aligner)
+
+    n_seg = store.n_segments
+    keys = ((columns.pair * len(POSITIONS) + columns.position) * n_seg + columns.seg_a) * n_seg + columns.seg_b
+    uniq, counts = np.unique(keys, return_counts=True)
+    seg_b_u = uniq % n_seg
+    seg_a_u = (uniq // n_seg) % n_seg
+    block = uniq // (n_seg * n_seg)
+
+    # Keys are sorted, so each (pair, position) block is one contiguous slice
+    bounds = np.searchsorted(block, np.arange(len(pairs) * len(POSITIONS) + 1))
+    matrices = {}
+    for p, (lang1, lang2) in enumerate(pairs):
+        for pos_idx, pos in enumerate(POSITIONS):
+            lo, hi = bounds[p * len(POSITIONS) + pos_idx], bounds[p * len(POSITIONS) + pos_idx + 1]
+            matrices[(lang1, lang2, pos)] = sparse.csr_matrix(
+                (counts[lo:hi], (seg_a_u[lo:hi], seg_b_u[lo:hi])), shape=(n_seg, n_seg))
+    return CorrespondenceTables(store, pairs, matrices)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Language Distance Matrix
+========================
+Lexical distances between language columns, computed once per unordered
+pair and returned in SciPy's condensed form (the upper triangle, row by
+row), which goes straight to scipy.cluster.hierarchy.linkage.
+
+Forms are segmented once into a FormStore; the per-gloss alignment
+distances of every pair are computed in chunks of pairs spread over a
+process pool. The resulting gloss × pair table can be averaged over any
+subset of glosses (a semantic domain, a bootstrap resample) without
+aligning anything again.
+
+Gloss bootstrap replicates reweight that table: each replicate is a
+vector of resampling counts per gloss, so a whole batch of replicate
+distance vectors is two matrix products. Clade support is the fraction of
+replicate trees that contain each clade of the reference tree;
+dendrogram_rows() finds the clade of each link SciPy's dendrogram draws,
+so the support can be written at the right node even when merges tie in
+height.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.cluster.hierarchy import linkage
+
+from alignment import SoundClassAligner
+from formstore import FormStore
+
+# Below this many pairs a pool costs more than it saves
+MIN_PARALLEL_PAIRS = 64
+
+_worker_aligner: Optional[SoundClassAligner] = None
+
+
+def condensed_pairs(n: int) -> List[Tuple[int, int]]:
+    """(i, j) index pairs with i < j, in condensed-vector order"""
+    return list(combinations(range(n), 2))
+
+
+def _init_worker(store: FormStore):
+    global _worker_aligner
+    _worker_aligner = SoundClassAligner(store)
+
+
+def _align_chunk(pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+    return _worker_aligner.distance_matrix(pairs)
+
+
+def gloss_pair_distances(store: FormStore, languages: Optional[Sequence[str]] = None,
+                         workers: Optional[int] = None) -> np.ndarray:
+    """
+    gloss × pair alignment distances for every unordered pair of
+    `languages` (condensed order), NaN where a gloss lacks either form
+    """
+    languages = store.languages if languages is None else list(languages)
+    pairs = [(languages[i], languages[j]) for i, j in condensed_pairs(len(languages))]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pairs) < MIN_PARALLEL_PAIRS:
+        return SoundClassAligner(store).distance_matrix(pairs)
+
+    n_chunks = min(len(pairs), workers * 4)
+    chunks = [pairs[k::n_chunks] for k in range(n_chunks)]
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(store,)) as pool:
+        results = list(pool.map(_align_chunk, chunks))
+    # Chunks are strided, so column k::n_chunks of the output is chunk k
+    out = np.empty((store.n_glosses, len(pairs)))
+    for k, result in enumerate(results):
+        out[:, k::n_chunks] = result
+    return out
+
+
+def condensed_distances(per_gloss: np.ndarray, rows: Optional[Sequence[int]] = None,
+                        missing: float = 1.0) -> np.ndarray:
+    """
+    Mean distance of each pair over the glosses in `rows` (all by default)
+    that both languages have; `missing` where they share none
+    """
+    if rows is not None:
+        per_gloss = per_gloss[np.asarray(rows, dtype=int)]
+    shared = (~np.isnan(per_gloss)).sum(axis=0)
+    totals = np.nansum(per_gloss, axis=0)
+    return np.where(shared > 0, totals / np.maximum(shared, 1), missing)
+
+
+def distance_matrix(store: FormStore, languages: Optional[Sequence[str]] = None,
+                    workers: Optional[int] = None) -> np.ndarray:
+    """Condensed language distance vector (see scipy.spatial.distance.squareform)"""
+    return condensed_distances(gloss_pair_distances(store, languages, workers))
+
+
+def bootstrap_weights(n_glosses: int, n_replicates: int = 1000, seed: Optional[int] = 0) -> np.ndarray:
+    """replicate × gloss resampling counts (glosses drawn with replacement)"""
+    rng = np.random.default_rng(seed)
+    return rng.multinomial(n_glosses, np.full(n_glosses, 1.0 / n_glosses),
+                           size=n_replicates).astype(np.float64)
+
+
+def bootstrap_distances(per_gloss: np.ndarray, n_replicates: int = 1000, seed: Optional[int] = 0,
+                        missing: float = 1.0) -> np.ndarray:
+    """
+    replicate × pair condensed distances from gloss bootstrap resamples of
+    a gloss × pair table (glosses drawn with replacement)
+    """
+    weights = bootstrap_weights(per_gloss.shape[0], n_replicates, seed)
+    present = ~np.isnan(per_gloss)
+    totals = weights @ np.where(present, per_gloss, 0.0)
+    shared = weights @ present.astype(np.float64)
+    return np.where(shared > 0, totals / np.maximum(shared, 1), missing)
+
+
+def clades(Z: np.ndarray) -> List[FrozenSet[int]]:
+    """Leaf set of each merge in a linkage matrix (row k -> node n + k)"""
+    n = len(Z) + 1
+    members = [frozenset([i]) for i in range(n)]
+    for a, b in Z[:, :2].astype(int):
+        members.append(members[a] | members[b])
+    return members[n:]
+
+
+def dendrogram_rows(Z: np.ndarray, dendro: Dict) -> List[int]:
+    """
+    Linkage row of each link of scipy's dendrogram(Z) output, in
+    dendro['icoord'] order, matched by the leaves under the link
+    """
+    row_of = {clade: k for k, clade in enumerate(clades(Z))}
+    # Leaf i of the plot sits at x = 5 + 10 i; a link sits at the middle of its top
+    below = {5.0 + 10.0 * i: frozenset([leaf]) for i, leaf in enumerate(dendro['leaves'])}
+    links = sorted(range(len(dendro['icoord'])), key=lambda j: dendro['dcoord'][j][1])
+    rows = [-1] * len(links)
+    while links:
+        pending = []
+        for j in links:
+            xs = dendro['icoord'][j]
+            if xs[0] in below and xs[3] in below:
+                clade = below[xs[0]] | below[xs[3]]
+                below[(xs[1] + xs[2]) / 2] = clade
+                rows[j] = row_of[clade]
+            else:
+                pending.append(j)
+        if len(pending) == len(links):
+            raise ValueError("dendrogram links do not match the linkage matrix")
+        links = pending
+    return rows
+
+
+def clade_support(Z: np.ndarray, replicates: np.ndarray, method: str = 'average') -> np.ndarray:
+    """
+    Fraction of replicate trees (one per row of condensed `replicates`,
+    clustered with `method`) that contain each clade of Z, in Z row order
+    """
+    reference = clades(Z)
+    hits = np.zeros(len(reference))
+    for condensed in replicates:
+        found = set(clades(linkage(condensed, method=method)))
+        hits += [clade in found for clade in reference]
+    return hits / len(replicates)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Semantic Domain Tagging
+=======================
+Tags glosses with semantic domains using whole-word keyword matches.
+
+All keywords of a domain table are compiled into one word-boundary regex,
+and every gloss is scanned in a single pass over the joined gloss text.
+Matching on word boundaries means 'ear' no longer hits 'year' or 'heart'.
+
+The result is a sparse DomainIndex (gloss position -> domains) that the
+parser report, advanced_analysis.py and the Swadesh notebook share.
+"""
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+# Swadesh list categories used by the parser report
+SWADESH_DOMAINS = {
+    'pronouns': ['I', 'you', 'he', 'we', 'they', 'this', 'that'],
+    'interrogatives': ['who', 'what', 'where', 'when', 'how'],
+    'body_parts': ['head', 'eye', 'ear', 'nose', 'mouth', 'tooth', 'tongue',
+                   'hand', 'foot', 'heart', 'blood', 'bone', 'skin', 'hair',
+                   'belly', 'neck', 'knee', 'finger', 'leg', 'breast', 'liver',
+                   'back', 'fingernail', 'wing', 'tail', 'feather', 'horn'],
+    'kinship': ['mother', 'father', 'wife', 'husband', 'child', 'man', 'woman'],
+    'animals': ['dog', 'fish', 'bird', 'snake', 'louse', 'worm', 'animal',
+                'deer', 'mouse', 'rabbit', 'eagle', 'spider'],
+    'nature': ['sun', 'moon', 'star', 'water', 'rain', 'river', 'lake', 'sea',
+               'fire', 'stone', 'sand', 'earth', 'cloud', 'sky', 'wind',
+               'mountain', 'tree', 'forest', 'leaf', 'root', 'flower', 'grass'],
+    'colors': ['red', 'green', 'yellow', 'white', 'black'],
+    'numerals': ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                 'eight', 'nine', 'ten'],
+    'verbs': ['eat', 'drink', 'sleep', 'die', 'kill', 'walk', 'come', 'go',
+              'see', 'hear', 'know', 'give', 'say', 'burn', 'fly', 'swim',
+              'sit', 'stand', 'lie', 'bite', 'suck', 'spit'],
+    'adjectives': ['big', 'small', 'long', 'short', 'good', 'bad', 'new',
+                   'old', 'hot', 'cold', 'wet', 'dry', 'full', 'round']
+}
+
+# Expanded categories used for the reconstruction coverage table
+RECONSTRUCTION_CATEGORIES = {
+    'basic_vocabulary': ['I', 'you', 'we', 'this', 'that', 'what', 'who', 'not', 'all'],
+    'numerals': ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten'],
+    'body_parts': ['head', 'eye', 'ear', 'nose', 'mouth', 'hand', 'foot', 'heart', 'blood', 'bone'],
+    'nature': ['sun', 'moon', 'star', 'water', 'fire', 'stone', 'tree', 'earth', 'rain'],
+    'animals': ['dog', 'fish', 'bird', 'snake', 'deer'],
+    'kinship': ['mother', 'father', 'man', 'woman', 'child'],
+    'colors': ['red', 'white', 'black', 'green', 'yellow'],
+    'actions': ['eat', 'drink', 'sleep', 'die', 'see', 'hear', 'come', 'go']
+}
+
+
+class DomainIndex:
+    """Sparse mapping between gloss positions and the domains they belong to"""
+
+    def __init__(self, domains: Sequence[str], n_glosses: int,
+                 by_gloss: Dict[int, Tuple[str, ...]]):
+        self.domains = list(domains)
+        self.n_glosses = n_glosses
+        self.by_gloss = by_gloss
+        members = {domain: [] for domain in self.domains}
+        for idx in sorted(by_gloss):
+            for domain in by_gloss[idx]:
+                members[domain].append(idx)
+        self._members = {d: np.asarray(ix, dtype=np.int64) for d, ix in members.items()}
+
+    def domains_of(self, idx: int) -> Tuple[str, ...]:
+        """Domains tagged on gloss position idx (empty tuple if none)"""
+        return self.by_gloss.get(idx, ())
+
+    def members(self, domain: str) -> np.ndarray:
+        """Gloss positions tagged with a domain"""
+        return self._members[domain]
+
+    def counts(self) -> Dict[str, int]:
+        return {d: len(ix) for d, ix in self._members.items()}
+
+
+class DomainTagger:
+    """Whole-word keyword matcher for one domain table"""
+
+    def __init__(self, domains: Dict[str, Sequence[str]]):
+        self.domains = list(domains)
+        self._keyword_domains = {}
+        for domain, keywords in domains.items():
+            for kw in keywords:
+                kw_domains = self._keyword_domains.setdefault(kw.lower(), [])
+                if domain not in kw_domains:
+                    kw_domains.append(domain)
+        # Longest keywords first so alternation prefers 'fingernail' over 'finger'
+        alternatives = sorted(self._keyword_domains, key=len, reverse=True)
+        self.pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, alternatives)) + r')\b')
+
+    def tag(self, gloss: str) -> Tuple[str, ...]:
+        """Domains of a single gloss"""
+        return self.index([gloss]).domains_of(0)
+
+    def index(self, glosses: Sequence[str]) -> DomainIndex:
+        """Tag every gloss in one scan over the joined, lowercased gloss text"""
+        starts = []
+        pos = 0
+        parts = []
+        for gloss in glosses:
+            text = gloss.lower().replace('\n', ' ')
+            starts.append(pos)
+            parts.append(text)
+            pos += len(text) + 1
+
+        hits = {}
+        for match in self.pattern.finditer('\n'.join(parts)):
+            idx = bisect_right(starts, match.start()) - 1
+            hits.setdefault(idx, set()).update(self._keyword_domains[match.group()])
+
+        # Keep the domain table's order within each gloss
+        order = {d: i for i, d in enumerate(self.domains)}
+        by_gloss = {idx: tuple(sorted(ds, key=order.__getitem__)) for idx, ds in hits.items()}
+        return DomainIndex(self.domains, len(parts), by_gloss)
+
+
+def _freeze(domains: Dict[str, Sequence[str]]) -> Tuple:
+    return tuple((d, tuple(kws)) for d, kws in domains.items())
+
+
+@lru_cache(maxsize=16)
+def _tagger(frozen: Tuple) -> DomainTagger:
+    return DomainTagger({d: list(kws) for d, kws in frozen})
+
+
+@lru_cache(maxsize=16)
+def _index(frozen: Tuple, glosses: Tuple[str, ...]) -> DomainIndex:
+    return _tagger(frozen).index(glosses)
+
+
+def domain_index(glosses: Sequence[str],
+                 domains: Dict[str, Sequence[str]] = SWADESH_DOMAINS) -> DomainIndex:
+    """Cached DomainIndex for a gloss list and domain table"""
+    return _index(_freeze(domains), tuple(glosses))
+
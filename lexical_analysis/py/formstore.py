@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Integer-Encoded Form Store
+==========================
+All segmented forms of the wordlist in one contiguous int32 array.
+
+Every distinct segment gets an integer ID (one vocabulary shared by all
+languages, so IDs can be compared across columns). Forms are stored in a
+CSR layout:
+
+    ids            int32, segment IDs of every variant, back to back
+    offsets        int64, variant v spans ids[offsets[v]:offsets[v + 1]]
+    cell_offsets   int64, cell c owns variants cell_offsets[c]:cell_offsets[c + 1]
+
+A cell is one (gloss, language) pair, c = gloss * n_languages + language.
+Comma-separated alternatives in a cell are separate variants; the cell's
+segments are its variants concatenated. from_columns() builds the same
+store from the columnar export (columnar.py), segmenting each distinct
+form of a language once. Inventories (inventories.py),
+alignments (alignment.py) and segment-set similarity (similarity.py) are
+then NumPy operations over `ids`.
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from segmenter import segment
+
+
+class FormStore:
+    """Segment IDs of every (gloss, language) cell in CSR layout"""
+
+    def __init__(self, glosses: Sequence[str], languages: Sequence[str], segments: Sequence[str],
+                 ids: np.ndarray, offsets: np.ndarray, cell_offsets: np.ndarray):
+        self.glosses = list(glosses)
+        self.languages = list(languages)
+        self.lang_index = {lang: i for i, lang in enumerate(self.languages)}
+        self.segments = np.array(segments, dtype=object)
+        self.segment_index = {seg: i for i, seg in enumerate(segments)}
+        self.ids = ids
+        self.offsets = offsets
+        self.cell_offsets = cell_offsets
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict], languages: Optional[Sequence[str]] = None):
+        """Segment every form of parsed entries ({'gloss', 'forms'} dicts)"""
+        entries = list(entries)
+        if languages is None:
+            languages = list(dict.fromkeys(lang for e in entries for lang in e['forms']))
+        vocab = {}
+        ids = []
+        offsets = [0]
+        cell_offsets = [0]
+        for entry in entries:
+            forms = entry['forms']
+            for lang in languages:
+                form = forms.get(lang, '')
+                if form:
+                    for variant in form.split(','):
+                        ids.extend(vocab.setdefault(seg, len(vocab)) for seg in segment(variant, lang))
+                        offsets.append(len(ids))
+                cell_offsets.append(len(offsets) - 1)
+        return cls([e['gloss'] for e in entries], languages, list(vocab),
+                   np.array(ids, dtype=np.int32), np.array(offsets, dtype=np.int64),
+                   np.array(cell_offsets, dtype=np.int64))
+
+    @classmethod
+    def from_columns(cls, wordlist, languages: Optional[Sequence[str]] = None):
+        """Segment the distinct forms of each column of a ColumnarWordlist"""
+        languages = list(wordlist.languages if languages is None else languages)
+        n_glosses = len(wordlist)
+        vocab = {}
+        ids = []
+        offsets = [0]
+        # Variants of every cell: count and first index into the variant table
+        n_variants = np.zeros((n_glosses, len(languages)), dtype=np.int64)
+        first = np.zeros((n_glosses, len(languages)), dtype=np.int64)
+        for j, lang in enumerate(languages):
+            base = len(offsets) - 1
+            counts = []
+            for form in wordlist.vocab(lang):
+                variants = form.split(',')
+                for variant in variants:
+                    ids.extend(vocab.setdefault(seg, len(vocab)) for seg in segment(variant, lang))
+                    offsets.append(len(ids))
+                counts.append(len(variants))
+            # Trailing 0 so code -1 (no form) has no variants
+            counts = np.array(counts + [0], dtype=np.int64)
+            codes = wordlist.codes(lang)
+            n_variants[:, j] = counts[codes]
+            first[:, j] = base + (np.cumsum(counts) - counts)[codes]
+
+        # Lay the variants out cell by cell (gloss-major), as from_entries does
+        ids, offsets = np.array(ids, dtype=np.int64), np.array(offsets, dtype=np.int64)
+        variants = _ranges(first.ravel(), n_variants.ravel())
+        lengths = offsets[variants + 1] - offsets[variants]
+        ids = ids[_ranges(offsets[variants], lengths)]
+        # Number segments in order of first appearance, as from_entries does
+        seen, first_seen, ids = np.unique(ids, return_index=True, return_inverse=True)
+        order = np.argsort(first_seen, kind='stable')
+        rank = np.empty(len(seen), dtype=np.int64)
+        rank[order] = np.arange(len(seen))
+        segments = np.array(list(vocab), dtype=object)[seen[order]]
+        return cls(list(wordlist.glosses), languages, list(segments), rank[ids].astype(np.int32),
+                   np.concatenate([[0], np.cumsum(lengths)]),
+                   np.concatenate([[0], np.cumsum(n_variants.ravel())]))
+
+    @property
+    def n_glosses(self) -> int:
+        return len(self.glosses)
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.segments)
+
+    def _cell(self, gloss: int, lang: str) -> int:
+        return gloss * len(self.languages) + self.lang_index[lang]
+
+    def cell(self, gloss: int, lang: str) -> np.ndarray:
+        """Segment IDs of one cell (all variants, in order)"""
+        c = self._cell(gloss, lang)
+        v0, v1 = self.cell_offsets[c], self.cell_offsets[c + 1]
+        return self.ids[self.offsets[v0]:self.offsets[v1]]
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self.segments[i] for i in ids]
+
+    def segment_ids(self, segments: Sequence[str]) -> np.ndarray:
+        """IDs of segment strings (all must be in the store)"""
+        distinct, inverse = np.unique(np.asarray(segments, dtype=str), return_inverse=True)
+        ids = np.array([self.segment_index[seg] for seg in distinct], dtype=np.int64)
+        return ids[inverse] if len(inverse) else np.zeros(0, dtype=np.int64)
+
+    def subset(self, glosses: Sequence[int]) -> 'FormStore':
+        """Store of the given gloss rows only, with the same segment IDs"""
+        rows = np.asarray(glosses, dtype=np.int64)
+        n_langs = len(self.languages)
+        cells = (rows[:, None] * n_langs + np.arange(n_langs)).ravel()
+        n_variants = self.cell_offsets[cells + 1] - self.cell_offsets[cells]
+        variants = _ranges(self.cell_offsets[cells], n_variants)
+        lengths = self.offsets[variants + 1] - self.offsets[variants]
+        sub = FormStore([self.glosses[r] for r in rows], self.languages, [],
+                        self.ids[_ranges(self.offsets[variants], lengths)],
+                        np.concatenate([[0], np.cumsum(lengths)]),
+                        np.concatenate([[0], np.cumsum(n_variants)]))
+        sub.segments, sub.segment_index = self.segments, self.segment_index
+        return sub
+
+    def gloss_hashes(self) -> List[str]:
+        """Hash of each gloss row's segmented cells (every variant of every language)"""
+        n_langs = len(self.languages)
+        out = []
+        for g in range(self.n_glosses):
+            cells = []
+            for j, lang in enumerate(self.languages):
+                c = g * n_langs + j
+                variants = [' '.join(self.segments[self.ids[self.offsets[v]:self.offsets[v + 1]]])
+                            for v in range(self.cell_offsets[c], self.cell_offsets[c + 1])]
+                cells.append(lang + '\t' + ','.join(variants))
+            out.append(hashlib.sha1('\n'.join(cells).encode('utf-8')).hexdigest())
+        return out
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """starts[i], starts[i] + 1, ..., starts[i] + lengths[i] - 1 for every i, concatenated"""
+    ends = np.cumsum(lengths)
+    return np.repeat(starts - ends + lengths, lengths) + np.arange(ends[-1] if len(ends) else 0)
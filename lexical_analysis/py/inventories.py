@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Segment Inventories
+===================
+Per-language segment counts from one pass over a FormStore.
+
+Each scan covers a range of glosses and produces three count tables, all
+indexed by the store's segment IDs:
+
+    counts       language × segment
+    positional   language × position × segment (initial, medial, final)
+    bigrams      adjacent segments of a variant, kept sparse: sorted packed
+                 (language, segment, segment) keys with their counts, since
+                 a dense language × segment × segment array is mostly zeros
+
+Positions are taken within each comma-separated variant, as in
+correspondences.py (a one-segment variant counts as initial). Counts of
+disjoint gloss ranges simply add up, so the glosses are split into shards,
+counted in a process pool and merged with `+`. The same tables feed the
+inventory report, the vowel/consonant split and the phonotactic summaries.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from alignment import sound_class
+from formstore import FormStore
+
+POSITIONS = ('initial', 'medial', 'final')
+
+# Below this many segments a pool costs more than it saves
+MIN_PARALLEL_SEGMENTS = 200_000
+
+_worker_store: Optional[FormStore] = None
+
+
+class InventoryCounts:
+    """Mergeable segment, positional and bigram counts per language"""
+
+    def __init__(self, languages: Sequence[str], segments: Sequence[str], counts: np.ndarray,
+                 positional: np.ndarray, bigram_keys: np.ndarray, bigram_values: np.ndarray):
+        self.languages = list(languages)
+        self.lang_index = {lang: i for i, lang in enumerate(self.languages)}
+        self.segments = np.asarray(segments, dtype=object)
+        self.counts = counts
+        self.positional = positional
+        # Sorted (language * n_seg + first) * n_seg + second, and their counts
+        self.bigram_keys = bigram_keys
+        self.bigram_values = bigram_values
+
+    @classmethod
+    def empty(cls, languages: Sequence[str], segments: Sequence[str]):
+        n_langs, n_seg = len(languages), len(segments)
+        return cls(languages, segments, np.zeros((n_langs, n_seg), dtype=np.int64),
+                   np.zeros((n_langs, len(POSITIONS), n_seg), dtype=np.int64),
+                   np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    def __add__(self, other: 'InventoryCounts') -> 'InventoryCounts':
+        if self.languages != other.languages or len(self.segments) != len(other.segments):
+            raise ValueError("inventory counts over different languages or segments")
+        keys, inverse = np.unique(np.concatenate([self.bigram_keys, other.bigram_keys]),
+                                  return_inverse=True)
+        values = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(values, inverse, np.concatenate([self.bigram_values, other.bigram_values]))
+        return InventoryCounts(self.languages, self.segments, self.counts + other.counts,
+                               self.positional + other.positional, keys, values)
+
+    def inventory(self, lang: str, min_count: int = 1) -> List[Tuple[str, int]]:
+        """(segment, count) of one language, most frequent first"""
+        row = self.counts[self.lang_index[lang]]
+        order = np.lexsort((np.arange(len(row)), -row))
+        return [(self.segments[i], int(row[i])) for i in order if row[i] >= min_count]
+
+    def position_counts(self, lang: str, position: str) -> np.ndarray:
+        return self.positional[self.lang_index[lang], POSITIONS.index(position)]
+
+    def bigram_counts(self, lang: str) -> sparse.csr_matrix:
+        """Sparse segment × segment counts of adjacent pairs (row: first segment)"""
+        n_seg = len(self.segments)
+        block = self.lang_index[lang] * n_seg * n_seg
+        lo, hi = np.searchsorted(self.bigram_keys, [block, block + n_seg * n_seg])
+        pairs = self.bigram_keys[lo:hi] - block
+        return sparse.csr_matrix((self.bigram_values[lo:hi], (pairs // n_seg, pairs % n_seg)),
+                                 shape=(n_seg, n_seg))
+
+    def vowels(self) -> np.ndarray:
+        """Boolean mask over segments in the vowel sound class"""
+        return np.array([sound_class(seg) == 'V' for seg in self.segments], dtype=bool)
+
+
+class Tokens(NamedTuple):
+    """One entry per segment of a gloss range, in store order"""
+    gloss: np.ndarray
+    lang: np.ndarray
+    ids: np.ndarray
+    index: np.ndarray
+    length: np.ndarray
+
+    @property
+    def position(self) -> np.ndarray:
+        """Position class of each segment (index into POSITIONS)"""
+        return np.where(self.index == 0, 0, np.where(self.index == self.length - 1, 2, 1))
+
+    @property
+    def has_next(self) -> np.ndarray:
+        """Segments followed by another segment of the same variant"""
+        return self.index < self.length - 1
+
+
+def tokens(store: FormStore, start: int = 0, stop: Optional[int] = None) -> Tokens:
+    """Gloss, language, segment ID, index within the variant and variant length of every segment"""
+    stop = store.n_glosses if stop is None else stop
+    n_langs = len(store.languages)
+    c0, c1 = start * n_langs, stop * n_langs
+    v0, v1 = store.cell_offsets[c0], store.cell_offsets[c1]
+
+    # Cell and variant of every segment in the range
+    cell_of_variant = np.repeat(np.arange(c0, c1), np.diff(store.cell_offsets[c0:c1 + 1]))
+    lengths = np.diff(store.offsets[v0:v1 + 1])
+    variant = np.repeat(np.arange(v0, v1), lengths)
+    cell = np.repeat(cell_of_variant, lengths)
+    ids = store.ids[store.offsets[v0]:store.offsets[v1]].astype(np.int64)
+    index = np.arange(len(ids)) + store.offsets[v0] - store.offsets[variant]
+    return Tokens(cell // n_langs, cell % n_langs, ids, index, np.repeat(lengths, lengths))
+
+
+def count_glosses(store: FormStore, start: int = 0, stop: Optional[int] = None) -> InventoryCounts:
+    """Counts over glosses start:stop of a store (all glosses by default)"""
+    n_langs, n_seg = len(store.languages), store.n_segments
+    tok = tokens(store, start, stop)
+    lang, ids = tok.lang, tok.ids
+
+    counts = np.bincount(lang * n_seg + ids, minlength=n_langs * n_seg)
+    positional = np.bincount((lang * len(POSITIONS) + tok.position) * n_seg + ids,
+                             minlength=n_langs * len(POSITIONS) * n_seg)
+    has_next = tok.has_next
+    nxt = ids[np.flatnonzero(has_next) + 1]
+    bigram_keys, bigram_values = np.unique((lang[has_next] * n_seg + ids[has_next]) * n_seg + nxt,
+                                           return_counts=True)
+    return InventoryCounts(store.languages, store.segments,
+                           counts.reshape(n_langs, n_seg),
+                           positional.reshape(n_langs, len(POSITIONS), n_seg),
+                           bigram_keys, bigram_values.astype(np.int64))
+
+
+def _init_worker(store: FormStore):
+    global _worker_store
+    _worker_store = store
+
+
+def _count_shard(bounds: Tuple[int, int]) -> InventoryCounts:
+    return count_glosses(_worker_store, *bounds)
+
+
+def gloss_shards(store: FormStore, n_shards: int) -> List[Tuple[int, int]]:
+    """(start, stop) gloss ranges with roughly equal numbers of segments"""
+    n_langs = len(store.languages)
+    seg_end = store.offsets[store.cell_offsets[np.arange(1, store.n_glosses + 1) * n_langs]]
+    targets = np.linspace(0, len(store.ids), n_shards + 1)[1:-1]
+    cuts = np.unique(np.concatenate([[0], np.searchsorted(seg_end, targets) + 1, [store.n_glosses]]))
+    return [(int(a), int(b)) for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def build_inventories(store: FormStore, workers: Optional[int] = None) -> InventoryCounts:
+    """Segment, positional and bigram counts of every language, sharded over a process pool"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(store.ids) < MIN_PARALLEL_SEGMENTS:
+        return count_glosses(store)
+
+    shards = gloss_shards(store, workers * 4)
+    total = InventoryCounts.empty(store.languages, store.segments)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(store,)) as pool:
+        for shard in pool.map(_count_shard, shards):
+            total = total + shard
+    return total
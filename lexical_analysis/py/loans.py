@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Loanword Detection
+==================
+Finds forms annotated as borrowings (e.g. 'algo (Spanish)') in a single
+scan over all form cells and builds an inverted index:
+
+    donor -> [(language, entry, gloss), ...]
+
+Donor annotations are matched with one compiled pattern whose named groups
+identify the donor (Spanish, Nahuatl, or a generic 'loan'/'borrowed'
+note). The index is written next to isthmus_parsed.json as
+isthmus_loans.json, so the cognate scan can exclude known loans without
+rescanning the wordlist.
+"""
+
+import json
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from schema import canonical_id
+
+LOAN_INDEX_FILE = 'isthmus_loans.json'
+
+# Donor -> regex for the annotation marking a borrowed form
+DONOR_MARKERS = {
+    'Spanish': r'\bspanish\b',
+    'Nahuatl': r'\bn[aá]huatl\b',
+    'loan': r'\bloan(?:word)?s?\b|\bborrow(?:ed|ing)?\b',
+}
+
+
+class LoanPosting(NamedTuple):
+    language: str
+    entry: Optional[int]
+    gloss: str
+
+
+def compile_markers(markers: Dict[str, str] = DONOR_MARKERS) -> re.Pattern:
+    """One case-insensitive pattern with a named group per donor"""
+    groups = [f'(?P<d{i}>{pattern})' for i, pattern in enumerate(markers.values())]
+    return re.compile('|'.join(groups), re.IGNORECASE)
+
+
+class LoanIndex:
+    """Inverted index from donor to the (language, entry, gloss) postings marked as loans"""
+
+    def __init__(self, postings: Dict[str, List[LoanPosting]],
+                 markers: Dict[str, str] = DONOR_MARKERS):
+        self.postings = postings
+        self.markers = dict(markers)
+        self._keys = {(p.language, p.entry) for ps in postings.values() for p in ps}
+
+    @property
+    def donors(self) -> List[str]:
+        return [d for d, ps in self.postings.items() if ps]
+
+    def is_loan(self, language: str, entry: Optional[int]) -> bool:
+        """True if the form of `entry` in `language` is marked as a loan"""
+        return (language, entry) in self._keys
+
+    def loan_keys(self) -> Set[Tuple[str, Optional[int]]]:
+        return set(self._keys)
+
+    def by_language(self, donor: str) -> Dict[str, List[str]]:
+        """Glosses per language for one donor, in wordlist order"""
+        out = {}
+        for p in self.postings.get(donor, []):
+            out.setdefault(p.language, []).append(p.gloss)
+        return out
+
+    def to_dict(self) -> Dict:
+        return {
+            'markers': self.markers,
+            'donors': {d: [p._asdict() for p in ps] for d, ps in self.postings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LoanIndex':
+        # Indexes saved before the schema registry may use legacy column keys
+        postings = {d: [LoanPosting(**dict(p, language=canonical_id(p['language']))) for p in ps]
+                    for d, ps in data['donors'].items()}
+        return cls(postings, data.get('markers', DONOR_MARKERS))
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def detect_loans(entries: Iterable, markers: Dict[str, str] = DONOR_MARKERS) -> LoanIndex:
+    """Scan every form cell once and index the donor annotations found"""
+    pattern = compile_markers(markers)
+    donors = list(markers)
+    postings = {donor: [] for donor in donors}
+
+    for entry in entries:
+        for lang, form in entry.forms.items():
+            found = set()
+            for match in pattern.finditer(form):
+                found.add(int(match.lastgroup[1:]))
+            for i in sorted(found):
+                postings[donors[i]].append(LoanPosting(lang, entry.entry_num, entry.gloss))
+    return LoanIndex(postings, markers)
+
+
+def load_loan_index(path: str) -> Optional[LoanIndex]:
+    """
+    Load isthmus_loans.json. `path` may be the index file itself or the
+    isthmus_parsed.json it sits next to. Returns None if it is missing.
+    """
+    if os.path.basename(path) != LOAN_INDEX_FILE:
+        path = os.path.join(os.path.dirname(path), LOAN_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return LoanIndex.from_dict(json.load(f))
@@ -11,297 +11,359 @@ Language families represented:
 - Totonacan: Totonac
 - Isolate: Huave
 - Chontal (Tequistlatecan)
-"""
-
-import pandas as pd
-import re
-import json
-from collections import defaultdict, Counter
-import unicodedata
-
-# Read the CSV with proper handling of multi-line cells
-df = pd.read_csv('Isthmus_script_languages.csv', encoding='utf-8')
-
-print("=" * 80)
-print("ISTHMUS SCRIPT LANGUAGES DATASET - PARSING REPORT")
-print("=" * 80)
-
-# Display column structure
-print("\n1. COLUMN STRUCTURE")
-print("-" * 40)
-for i, col in enumerate(df.columns):
-    print(f"  [{i}] {col}")
-
-# Get the dialect/variety info from row 0
-print("\n2. LANGUAGE VARIETIES (from header row)")
-print("-" * 40)
-varieties = df.iloc[0].to_dict()
-for col, variety in varieties.items():
-    if pd.notna(variety) and variety.strip():
-        print(f"  {col}: {variety}")
-
-# Remove the variety row and reset
-df_clean = df.iloc[1:].copy()
-df_clean.columns = df.columns
-df_clean = df_clean.reset_index(drop=True)
-
-# Rename columns for clarity
-column_mapping = {
-    '№': 'entry_num',
-    'English': 'gloss',
-    'Otomian languages': 'otomian',
-    'Trique languages': 'trique',
-    'Mixtec languages': 'proto_mixtec',
-    'Unnamed: 4': 'mixtec_tlaxiaco',
-    'Zapotec languages': 'zapotec_isthmus',
-    'Unnamed: 6': 'zapotec_xhon',
-    'Mazahua languages': 'mazahua',
-    'Totonac languages': 'totonac',
-    'Popoluca languages': 'popoluca',
-    'Huave languages': 'huave',
-    'Chontal languages': 'chontal'
-}
 
-# Apply mapping where columns exist
-new_columns = []
-for col in df_clean.columns:
-    if col in column_mapping:
-        new_columns.append(column_mapping[col])
-    else:
-        new_columns.append(col)
-df_clean.columns = new_columns
-
-print("\n3. DATASET STATISTICS")
-print("-" * 40)
-print(f"  Total entries (glosses): {len(df_clean)}")
-print(f"  Languages/varieties: {len(df_clean.columns) - 2}")  # minus entry_num and gloss
-
-# Count non-empty cells per language
-print("\n4. DATA COMPLETENESS BY LANGUAGE")
-print("-" * 40)
-language_cols = [c for c in df_clean.columns if c not in ['entry_num', 'gloss']]
-
-completeness = {}
-for col in language_cols:
-    non_empty = df_clean[col].notna().sum()
-    non_empty_actual = df_clean[col].apply(lambda x: bool(str(x).strip()) if pd.notna(x) else False).sum()
-    completeness[col] = non_empty_actual
-    pct = (non_empty_actual / len(df_clean)) * 100
-    print(f"  {col:20s}: {non_empty_actual:3d} entries ({pct:5.1f}%)")
-
-# Language family groupings
-print("\n5. LANGUAGE FAMILY GROUPINGS")
-print("-" * 40)
-families = {
-    'Otomanguean': {
-        'Oto-Pamean': ['otomian', 'mazahua'],
-        'Mixtecan': ['trique', 'proto_mixtec', 'mixtec_tlaxiaco'],
-        'Zapotecan': ['zapotec_isthmus', 'zapotec_xhon']
-    },
-    'Mixe-Zoquean': ['popoluca'],
-    'Totonacan': ['totonac'],
-    'Huavean (isolate)': ['huave'],
-    'Tequistlatecan': ['chontal']
-}
+Usage:
+    python parse_isthmus_data.py [CSV] [--sections 4,7,10] [--out-dir DIR]
 
-for family, members in families.items():
-    print(f"\n  {family}:")
-    if isinstance(members, dict):
-        for branch, langs in members.items():
-            print(f"    └─ {branch}: {', '.join(langs)}")
-    else:
-        print(f"    └─ {', '.join(members)}")
-
-# Extract and analyze Proto-Mixtec forms
-print("\n6. PROTO-MIXTEC RECONSTRUCTIONS")
-print("-" * 40)
-proto_mixtec_forms = df_clean[['gloss', 'proto_mixtec']].dropna(subset=['proto_mixtec'])
-proto_mixtec_forms = proto_mixtec_forms[proto_mixtec_forms['proto_mixtec'].str.strip() != '']
-
-print(f"  Total Proto-Mixtec forms: {len(proto_mixtec_forms)}")
-print("\n  Sample Proto-Mixtec reconstructions:")
-for _, row in proto_mixtec_forms.head(15).iterrows():
-    gloss = str(row['gloss']).replace('\n', ' ')[:25]
-    form = str(row['proto_mixtec'])
-    print(f"    '{gloss:25s}' : {form}")
-
-# Phoneme inventory extraction
-print("\n7. PHONEME/GRAPHEME INVENTORY ANALYSIS")
-print("-" * 40)
-
-def extract_segments(text):
-    """Extract potential phonemic segments from transcriptions"""
-    if pd.isna(text) or not str(text).strip():
-        return set()
-    
-    text = str(text)
-    # Remove common annotations
-    text = re.sub(r'\([^)]*\)', '', text)  # Remove parenthetical notes
-    text = re.sub(r'\*', '', text)  # Remove reconstruction markers
-    text = re.sub(r'[0-9]+', '', text)  # Remove tone numbers for now
-    text = re.sub(r'[,;/\-\s]+', ' ', text)  # Normalize separators
-    
-    # Get unique characters (simplified)
-    chars = set()
-    for char in text:
-        if unicodedata.category(char)[0] == 'L':  # Letters only
-            chars.add(char.lower())
-    return chars
-
-# Collect segments per language
-language_inventories = {}
-for col in language_cols:
-    all_segments = set()
-    for val in df_clean[col]:
-        all_segments.update(extract_segments(val))
-    language_inventories[col] = sorted(all_segments)
-
-print("\n  Unique graphemes per language:")
-for lang, segments in language_inventories.items():
-    print(f"    {lang:20s}: {len(segments):3d} unique characters")
-
-# Semantic domain analysis
-print("\n8. SEMANTIC DOMAIN CATEGORIZATION")
-print("-" * 40)
-
-# Define semantic domains based on Swadesh list categories
-semantic_domains = {
-    'pronouns': ['I', 'you', 'he', 'we', 'they', 'this', 'that'],
-    'interrogatives': ['who', 'what', 'where', 'when', 'how'],
-    'body_parts': ['head', 'eye', 'ear', 'nose', 'mouth', 'tooth', 'tongue', 
-                   'hand', 'foot', 'heart', 'blood', 'bone', 'skin', 'hair',
-                   'belly', 'neck', 'knee', 'finger', 'leg', 'breast', 'liver',
-                   'back', 'fingernail', 'wing', 'tail', 'feather', 'horn'],
-    'kinship': ['mother', 'father', 'wife', 'husband', 'child', 'man', 'woman'],
-    'animals': ['dog', 'fish', 'bird', 'snake', 'louse', 'worm', 'animal',
-                'deer', 'mouse', 'rabbit', 'eagle', 'spider'],
-    'nature': ['sun', 'moon', 'star', 'water', 'rain', 'river', 'lake', 'sea',
-               'fire', 'stone', 'sand', 'earth', 'cloud', 'sky', 'wind', 
-               'mountain', 'tree', 'forest', 'leaf', 'root', 'flower', 'grass'],
-    'colors': ['red', 'green', 'yellow', 'white', 'black'],
-    'numerals': ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 
-                 'eight', 'nine', 'ten'],
-    'verbs': ['eat', 'drink', 'sleep', 'die', 'kill', 'walk', 'come', 'go',
-              'see', 'hear', 'know', 'give', 'say', 'burn', 'fly', 'swim',
-              'sit', 'stand', 'lie', 'bite', 'suck', 'spit'],
-    'adjectives': ['big', 'small', 'long', 'short', 'good', 'bad', 'new', 
-                   'old', 'hot', 'cold', 'wet', 'dry', 'full', 'round']
-}
+The wordlist itself is read through wordlist.WordlistLoader; this script
+only renders the report and writes the derived files.
+"""
 
-# Categorize entries
-domain_coverage = defaultdict(lambda: defaultdict(int))
-
-for _, row in df_clean.iterrows():
-    gloss = str(row['gloss']).lower().replace('\n', ' ')
-    
-    for domain, keywords in semantic_domains.items():
-        for keyword in keywords:
-            if keyword.lower() in gloss:
-                for lang in language_cols:
-                    if pd.notna(row[lang]) and str(row[lang]).strip():
-                        domain_coverage[domain][lang] += 1
-                break
-
-print("\n  Entries per semantic domain:")
-for domain in semantic_domains.keys():
-    total = sum(domain_coverage[domain].values())
-    if total > 0:
-        print(f"    {domain:15s}: {total // len(language_cols):3d} avg entries")
-
-# Detect Spanish loanwords
-print("\n9. SPANISH LOANWORD DETECTION")
-print("-" * 40)
-
-spanish_markers = ['Spanish', 'spanish', '(Spanish)']
-loanwords = defaultdict(list)
-
-for _, row in df_clean.iterrows():
-    gloss = str(row['gloss']).replace('\n', ' ')
-    for lang in language_cols:
-        val = str(row[lang]) if pd.notna(row[lang]) else ''
-        for marker in spanish_markers:
-            if marker in val:
-                loanwords[lang].append(gloss)
-                break
-
-print("\n  Spanish loans marked per language:")
-for lang, loans in sorted(loanwords.items(), key=lambda x: -len(x[1])):
-    if loans:
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter
+
+from columnar import COLUMNAR_FILE, write_columnar
+from completeness import PresenceMatrix
+from domains import SWADESH_DOMAINS, domain_index
+from formstore import FormStore
+from inventories import build_inventories
+from loans import DONOR_MARKERS, LOAN_INDEX_FILE, LoanIndex, LoanPosting, detect_loans
+from rowcache import RowCache, hash_text
+from schema import SCHEMA_VERSION, family_tree
+from wordlist import Entry, WordlistLoader
+
+# Language family groupings (from the schema registry)
+families = family_tree()
+
+
+# ============================================================================
+# REPORT SECTIONS
+# ============================================================================
+
+def section_columns(loader, entries, ctx):
+    print("\n1. COLUMN STRUCTURE")
+    print("-" * 40)
+    for i, col in enumerate(loader.raw_columns):
+        print(f"  [{i}] {col}")
+
+
+def section_varieties(loader, entries, ctx):
+    print("\n2. LANGUAGE VARIETIES (from header row)")
+    print("-" * 40)
+    raw_by_col = dict(zip(loader.columns, loader.raw_columns))
+    for col, variety in loader.varieties.items():
+        print(f"  {raw_by_col[col]}: {variety}")
+
+
+def section_statistics(loader, entries, ctx):
+    print("\n3. DATASET STATISTICS")
+    print("-" * 40)
+    print(f"  Total entries (glosses): {len(entries)}")
+    print(f"  Languages/varieties: {len(loader.languages)}")
+
+
+def section_completeness(loader, entries, ctx):
+    print("\n4. DATA COMPLETENESS BY LANGUAGE")
+    print("-" * 40)
+    presence = ctx['presence']
+    coverage = presence.language_coverage()
+    for col, non_empty in ctx['completeness'].items():
+        print(f"  {col:20s}: {non_empty:3d} entries ({coverage[col]:5.1f}%)")
+
+    print("\n  Coverage by family (gloss attested in any member):")
+    for family, pct in presence.family_coverage(families).items():
+        print(f"    {family:20s}: {pct:5.1f}%")
+
+    per_gloss = presence.gloss_coverage()
+    print(f"\n  Glosses attested in every variety: {int((per_gloss == len(presence.languages)).sum())}")
+    print(f"  Glosses attested in fewer than half: {int((per_gloss * 2 < len(presence.languages)).sum())}")
+
+
+def section_families(loader, entries, ctx):
+    print("\n5. LANGUAGE FAMILY GROUPINGS")
+    print("-" * 40)
+    for family, members in families.items():
+        print(f"\n  {family}:")
+        if isinstance(members, dict):
+            for branch, langs in members.items():
+                print(f"    └─ {branch}: {', '.join(langs)}")
+        else:
+            print(f"    └─ {', '.join(members)}")
+
+
+def section_proto_mixtec(loader, entries, ctx):
+    print("\n6. PROTO-MIXTEC RECONSTRUCTIONS")
+    print("-" * 40)
+    proto_mixtec_forms = ctx['proto_mixtec_forms']
+    print(f"  Total Proto-Mixtec forms: {len(proto_mixtec_forms)}")
+    print("\n  Sample Proto-Mixtec reconstructions:")
+    for entry in proto_mixtec_forms[:15]:
+        gloss = entry.gloss[:25]
+        form = entry.forms['proto_mixtec']
+        print(f"    '{gloss:25s}' : {form}")
+
+
+def section_inventories(loader, entries, ctx):
+    print("\n7. PHONEME/GRAPHEME INVENTORY ANALYSIS")
+    print("-" * 40)
+
+    # Segment counts of every language in one scan (see inventories.py)
+    store = FormStore.from_entries((entry.to_dict() for entry in entries), loader.languages)
+    counts = build_inventories(store)
+    vowels = counts.vowels()
+
+    print("\n  Segments per language (vowels / consonants, tokens):")
+    for lang in loader.languages:
+        present = counts.counts[counts.lang_index[lang]] > 0
+        n_vowels = int((present & vowels).sum())
+        n_tokens = int(counts.counts[counts.lang_index[lang]].sum())
+        print(f"    {lang:20s}: {present.sum():3d} unique segments "
+              f"({n_vowels} / {present.sum() - n_vowels}, {n_tokens} tokens)")
+
+
+def section_domains(loader, entries, ctx):
+    print("\n8. SEMANTIC DOMAIN CATEGORIZATION")
+    print("-" * 40)
+    language_cols = loader.languages
+
+    # Categorize entries (one scan over all glosses)
+    index = domain_index([entry.gloss for entry in entries], SWADESH_DOMAINS)
+    forms_per_gloss = ctx['presence'].gloss_coverage()
+
+    print("\n  Entries per semantic domain:")
+    for domain in SWADESH_DOMAINS:
+        total = int(forms_per_gloss[index.members(domain)].sum())
+        if total > 0:
+            print(f"    {domain:15s}: {total // len(language_cols):3d} avg entries")
+
+
+def section_loans(loader, entries, ctx):
+    print("\n9. SPANISH LOANWORD DETECTION")
+    print("-" * 40)
+
+    loan_index = ctx['loans']
+    print("\n  Spanish loans marked per language:")
+    loanwords = loan_index.by_language('Spanish')
+    for lang, loans in sorted(loanwords.items(), key=lambda x: -len(x[1])):
         print(f"    {lang:20s}: {len(loans):2d} marked loans")
         for loan in loans[:3]:
             print(f"      - {loan[:40]}")
 
-# Create structured output
-print("\n10. GENERATING STRUCTURED DATA FILES")
-print("-" * 40)
-
-# Create a clean JSON export
-output_data = {
-    'metadata': {
-        'title': 'Isthmus Script Languages Comparative Wordlist',
-        'total_entries': int(len(df_clean)),
-        'languages': language_cols,
-        'families': families
-    },
-    'completeness': {k: int(v) for k, v in completeness.items()},
-    'entries': []
-}
+    for donor in loan_index.donors:
+        if donor != 'Spanish':
+            n = len(loan_index.postings[donor])
+            print(f"\n  Forms marked '{donor}': {n}")
+
+
+OUTPUT_FILES = ['isthmus_parsed.json', COLUMNAR_FILE, LOAN_INDEX_FILE,
+                'isthmus_cleaned.csv', 'proto_mixtec_forms.csv']
+ROWCACHE_FILE = '.isthmus_rowcache.json'
+# Bump when export_contribution() changes
+ROWCACHE_VERSION = 'export/2'
+
+
+def export_contribution(entry, raw):
+    """One wordlist row's share of the exported files (see rowcache.py)"""
+    loans = detect_loans([Entry(entry['id'], entry['gloss'], entry['forms'])])
+    return {
+        'counts': {'completeness': Counter({(lang,): 1 for lang in entry['forms']})},
+        'records': {
+            'cleaned': [raw],
+            'proto_mixtec': [raw] if raw.get('proto_mixtec') else [],
+            'loans': [dict(p._asdict(), donor=donor)
+                      for donor, postings in loans.postings.items() for p in postings],
+        },
+    }
 
-for _, row in df_clean.iterrows():
-    entry = {
-        'id': row['entry_num'],
-        'gloss': str(row['gloss']).replace('\n', ' ') if pd.notna(row['gloss']) else '',
-        'forms': {}
+
+def section_export(loader, entries, ctx):
+    print("\n10. GENERATING STRUCTURED DATA FILES")
+    print("-" * 40)
+    out_dir = ctx['out_dir']
+    language_cols = loader.languages
+
+    # Skip the rewrite when no wordlist row changed since the last export
+    row_cache = RowCache(os.path.join(out_dir, ROWCACHE_FILE),
+                         hash_text('\t'.join([ROWCACHE_VERSION, SCHEMA_VERSION] + loader.columns)))
+    entry_dicts = [entry.to_dict() for entry in entries]
+    outputs_exist = all(os.path.exists(os.path.join(out_dir, name)) for name in OUTPUT_FILES)
+    if not ctx['force'] and outputs_exist and row_cache.is_current(entry_dicts):
+        print("  ✓ Outputs up to date (no wordlist rows changed)")
+        return
+
+    # Only edited rows are re-derived; the outputs below are assembled
+    # from the patched per-row contributions
+    raw_rows = list(loader.rows())
+    stats = row_cache.update(entry_dicts, lambda i: export_contribution(entry_dicts[i], raw_rows[i]))
+    present = row_cache.counts('completeness')
+    completeness = {lang: present.get((lang,), 0) for lang in language_cols}
+    postings = {donor: [] for donor in DONOR_MARKERS}
+    for record in row_cache.records('loans'):
+        record = dict(record)
+        postings[record.pop('donor')].append(LoanPosting(**record))
+
+    # Create a clean JSON export
+    output_data = {
+        'metadata': {
+            'title': 'Isthmus Script Languages Comparative Wordlist',
+            'total_entries': len(entries),
+            'languages': language_cols,
+            'families': families
+        },
+        'completeness': completeness,
+        'entries': entry_dicts
     }
-    for lang in language_cols:
-        if pd.notna(row[lang]) and str(row[lang]).strip():
-            entry['forms'][lang] = str(row[lang])
-    output_data['entries'].append(entry)
-
-# Save JSON
-with open('isthmus_parsed.json', 'w', encoding='utf-8') as f:
-    json.dump(output_data, f, ensure_ascii=False, indent=2)
-print("  ✓ Saved: isthmus_parsed.json")
-
-# Save clean CSV
-df_clean.to_csv('isthmus_cleaned.csv', index=False, encoding='utf-8')
-print("  ✓ Saved: isthmus_cleaned.csv")
-
-# Create a Proto-Mixtec focused file
-mixtec_cols = ['entry_num', 'gloss', 'proto_mixtec', 'trique']
-# Add the Tlaxiaco column if it exists
-if 'Unnamed: 5' in df_clean.columns:
-    mixtec_cols.append('Unnamed: 5')
-proto_mixtec_data = df_clean[mixtec_cols].copy()
-proto_mixtec_data = proto_mixtec_data.dropna(subset=['proto_mixtec'])
-proto_mixtec_data.to_csv('proto_mixtec_forms.csv', index=False, encoding='utf-8')
-print("  ✓ Saved: proto_mixtec_forms.csv")
-
-# Summary statistics table
-print("\n" + "=" * 80)
-print("PARSING COMPLETE - SUMMARY")
-print("=" * 80)
-print(f"""
+
+    # Save JSON
+    with open(os.path.join(out_dir, 'isthmus_parsed.json'), 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    print("  ✓ Saved: isthmus_parsed.json")
+
+    # Columnar binary copy of the same table
+    header = {k: v for k, v in output_data.items() if k != 'entries'}
+    write_columnar(os.path.join(out_dir, COLUMNAR_FILE), entries, language_cols, header)
+    print(f"  ✓ Saved: {COLUMNAR_FILE}")
+
+    # Loan index next to the JSON, for the cognate scan
+    LoanIndex(postings).save(os.path.join(out_dir, LOAN_INDEX_FILE))
+    print(f"  ✓ Saved: {LOAN_INDEX_FILE}")
+
+    # Save clean CSV
+    columns = loader.columns
+    with open(os.path.join(out_dir, 'isthmus_cleaned.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(row_cache.records('cleaned'))
+    print("  ✓ Saved: isthmus_cleaned.csv")
+
+    # Create a Proto-Mixtec focused file
+    mixtec_cols = ['entry_num', 'gloss', 'proto_mixtec', 'trique']
+    # Add the Tlaxiaco column if it exists
+    if 'mixtec_tlaxiaco' in columns:
+        mixtec_cols.append('mixtec_tlaxiaco')
+    with open(os.path.join(out_dir, 'proto_mixtec_forms.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=mixtec_cols, extrasaction='ignore',
+                                lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(row_cache.records('proto_mixtec'))
+    print("  ✓ Saved: proto_mixtec_forms.csv")
+
+    row_cache.save()
+    print(f"  ({stats.changed} rows re-derived, {stats.reused} reused, "
+          f"{stats.removed} removed since last export)")
+
+
+class ReportContext(dict):
+    """Shared section inputs; derived tables are built on first use by a section"""
+
+    def __init__(self, factories, **values):
+        super().__init__(values)
+        self.factories = factories
+
+    def __missing__(self, key):
+        value = self[key] = self.factories[key]()
+        return value
+
+
+def print_summary(loader, entries, ctx):
+    completeness = ctx['completeness']
+    print("\n" + "=" * 80)
+    print("PARSING COMPLETE - SUMMARY")
+    print("=" * 80)
+    print(f"""
   Dataset: Isthmus Script Languages Comparative Wordlist
-  
-  Entries:     {len(df_clean)} glosses (Swadesh-style list)
-  Languages:   {len(language_cols)} varieties across 5 families
-  
+
+  Entries:     {len(entries)} glosses (Swadesh-style list)
+  Languages:   {len(loader.languages)} varieties across 5 families
+
   Best documented:
     - Zapotec (Isthmus): {completeness.get('zapotec_isthmus', 0)} entries
     - Otomian:          {completeness.get('otomian', 0)} entries
     - Chontal:          {completeness.get('chontal', 0)} entries
-  
+
   Proto-forms available:
-    - Proto-Mixtec:     {len(proto_mixtec_forms)} reconstructions
-  
+    - Proto-Mixtec:     {len(ctx['proto_mixtec_forms'])} reconstructions
+
   Relevance to Cologne Project:
     ✓ Otomanguean data (for Proto-Otomanguean reconstruction)
     ✓ Popoluca data (for Proto-Mixe-Zoquean comparison)
     ✓ Multiple Zapotecan varieties (Isthmus region focus)
-    
+
   Output files:
     - isthmus_parsed.json   (structured data)
+    - isthmus_parsed.npz    (columnar copy, per-language columns)
+    - isthmus_loans.json    (marked loanwords by donor)
     - isthmus_cleaned.csv   (cleaned tabular data)
     - proto_mixtec_forms.csv (Proto-Mixtec focus)
 """)
+
+
+SECTIONS = {
+    1: section_columns,
+    2: section_varieties,
+    3: section_statistics,
+    4: section_completeness,
+    5: section_families,
+    6: section_proto_mixtec,
+    7: section_inventories,
+    8: section_domains,
+    9: section_loans,
+    10: section_export,
+}
+
+
+def export(csv_path='Isthmus_script_languages.csv', out_dir='.', force=False):
+    """Write the derived files (section 10) without the rest of the report"""
+    loader = WordlistLoader(csv_path)
+    section_export(loader, list(loader), ReportContext({}, out_dir=out_dir, force=force))
+    return [os.path.join(out_dir, name) for name in OUTPUT_FILES]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parse the Isthmus comparative wordlist')
+    parser.add_argument('csv', nargs='?', default='Isthmus_script_languages.csv',
+                        help='wordlist CSV (default: Isthmus_script_languages.csv)')
+    parser.add_argument('--sections', default=None,
+                        help='comma-separated report sections to run, e.g. 4,7,10 (default: all)')
+    parser.add_argument('--out-dir', default='.',
+                        help='directory for the generated files (default: current directory)')
+    parser.add_argument('--force', action='store_true',
+                        help='rewrite the generated files even if no rows changed')
+    args = parser.parse_args(argv)
+
+    if args.sections:
+        selected = [int(s) for s in args.sections.split(',') if s.strip()]
+        unknown = [s for s in selected if s not in SECTIONS]
+        if unknown:
+            parser.error(f"unknown section(s): {', '.join(map(str, unknown))}")
+    else:
+        selected = sorted(SECTIONS)
+
+    loader = WordlistLoader(args.csv)
+    entries = list(loader)
+    # Presence matrix and loan index only for the sections that read them
+    ctx = ReportContext({
+        'presence': lambda: PresenceMatrix.from_entries(entries, loader.languages),
+        'completeness': lambda: ctx['presence'].language_counts(),
+        'loans': lambda: detect_loans(entries),
+        'proto_mixtec_forms': lambda: [e for e in entries if 'proto_mixtec' in e.forms],
+    }, out_dir=args.out_dir, force=args.force)
+
+    print("=" * 80)
+    print("ISTHMUS SCRIPT LANGUAGES DATASET - PARSING REPORT")
+    print("=" * 80)
+
+    for number in selected:
+        SECTIONS[number](loader, entries, ctx)
+
+    if args.sections is None:
+        print_summary(loader, entries, ctx)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Phonotactic Priors
+==================
+Family-level phonotactic statistics estimated from the wordlist, for the
+Bayesian affiliation model (the PHONOTACTIC_PRIORS of
+isthmian_bayesian_with_maya_comparison.ipynb).
+
+Every comma-separated variant of a family's columns counts as one form,
+and a form's segments play the part of the script's signs:
+
+    seg_len_mean, seg_len_cv, max_seg_ratio   form lengths in segments
+    initial_entropy, final_entropy            entropy (bits) of first/last segments
+    bigram_entropy                            entropy of within-form segment bigrams
+    freq_concentration                        share of the ten most frequent segments
+
+All statistics are computed from gloss × count tables, so a bootstrap
+over glosses is a matrix product with the replicate × gloss resampling
+weights (distances.bootstrap_weights); the point estimate is the same
+computation with every weight 1. Standard deviations are taken over the
+replicates.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from distances import bootstrap_weights
+from formstore import FormStore
+from inventories import tokens
+from schema import FAMILIES, languages_in
+
+FEATURES = ('seg_len_mean', 'seg_len_cv', 'max_seg_ratio', 'initial_entropy',
+            'final_entropy', 'bigram_entropy', 'freq_concentration')
+
+# Segments counted in freq_concentration
+TOP_SEGMENTS = 10
+
+
+class PhonotacticPrior(NamedTuple):
+    family: str
+    languages: List[str]
+    n_forms: int
+    mean: Dict[str, float]
+    sd: Dict[str, float]
+
+
+def _entropy(counts: np.ndarray) -> np.ndarray:
+    """Entropy in bits of each row of a count matrix"""
+    totals = counts.sum(axis=1, keepdims=True)
+    p = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+    logs = np.log2(p, out=np.zeros_like(p), where=p > 0)
+    return -(p * logs).sum(axis=1)
+
+
+def _group_max(groups: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    out = np.zeros(n_groups)
+    np.maximum.at(out, groups, values)
+    return out
+
+
+def _table(rows: np.ndarray, cols: np.ndarray, n_rows: int) -> np.ndarray:
+    """rows × distinct-cols matrix counting each (row, col) pair"""
+    # Only the codes that occur get a column, so a bigram table grows with
+    # the bigram types seen rather than with the square of the inventory
+    _, cols = np.unique(cols, return_inverse=True)
+    n_cols = int(cols.max()) + 1 if len(cols) else 0
+    counts = np.bincount(rows * n_cols + cols, minlength=n_rows * n_cols)
+    return counts.reshape(n_rows, n_cols).astype(np.float64)
+
+
+class GlossTables(NamedTuple):
+    """Per-gloss counts of one group of languages"""
+    n_forms: np.ndarray
+    length_sum: np.ndarray
+    length_sq: np.ndarray
+    length_max: np.ndarray
+    unigrams: np.ndarray
+    initials: np.ndarray
+    finals: np.ndarray
+    bigrams: np.ndarray
+
+
+def gloss_tables(store: FormStore, languages: Sequence[str]) -> GlossTables:
+    """Form-length sums and segment, initial, final and bigram counts of each gloss (columns: types seen)"""
+    n_g, n_seg = store.n_glosses, store.n_segments
+    tok = tokens(store)
+    keep = np.isin(tok.lang, [store.lang_index[lang] for lang in languages])
+    gloss, ids, index, length = tok.gloss[keep], tok.ids[keep], tok.index[keep], tok.length[keep]
+
+    first = index == 0
+    last = index == length - 1
+    # Tokens are in store order, so a non-final token's successor is the next one
+    has_next = np.flatnonzero(~last)
+    following = tok.ids[np.flatnonzero(keep)[has_next] + 1]
+
+    form_len = length[first].astype(np.float64)
+    return GlossTables(
+        n_forms=np.bincount(gloss[first], minlength=n_g).astype(np.float64),
+        length_sum=np.bincount(gloss[first], weights=form_len, minlength=n_g),
+        length_sq=np.bincount(gloss[first], weights=form_len ** 2, minlength=n_g),
+        length_max=_group_max(gloss[first], form_len, n_g),
+        unigrams=_table(gloss, ids, n_g),
+        initials=_table(gloss[first], ids[first], n_g),
+        finals=_table(gloss[last], ids[last], n_g),
+        bigrams=_table(gloss[has_next], ids[has_next].astype(np.int64) * n_seg + following, n_g))
+
+
+def weighted_features(tables: GlossTables, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """Each feature for every row of a replicate × gloss weight matrix"""
+    n = weights @ tables.n_forms
+    mean = weights @ tables.length_sum / n
+    var = np.maximum(weights @ tables.length_sq / n - mean ** 2, 0.0)
+    longest = np.where(weights > 0, tables.length_max[None, :], 0.0).max(axis=1)
+    unigrams = weights @ tables.unigrams
+    top = np.sort(unigrams, axis=1)[:, -TOP_SEGMENTS:].sum(axis=1)
+    return {
+        'seg_len_mean': mean,
+        'seg_len_cv': np.sqrt(var) / mean,
+        'max_seg_ratio': longest / mean,
+        'initial_entropy': _entropy(weights @ tables.initials),
+        'final_entropy': _entropy(weights @ tables.finals),
+        'bigram_entropy': _entropy(weights @ tables.bigrams),
+        'freq_concentration': top / unigrams.sum(axis=1),
+    }
+
+
+def family_languages(families: Optional[Sequence[str]] = None) -> Dict[str, List[str]]:
+    """{family: variety IDs} for schema families (all by default)"""
+    return {family: languages_in(family) for family in (families or FAMILIES)}
+
+
+def phonotactic_priors(store: FormStore, families: Optional[Dict[str, Sequence[str]]] = None,
+                       n_replicates: int = 1000, seed: Optional[int] = 0) -> Dict[str, PhonotacticPrior]:
+    """Point estimates and gloss-bootstrap SDs of FEATURES for each family's columns"""
+    families = family_languages() if families is None else families
+    weights = bootstrap_weights(store.n_glosses, n_replicates, seed)
+    out = {}
+    for family, languages in families.items():
+        languages = [lang for lang in languages if lang in store.lang_index]
+        tables = gloss_tables(store, languages)
+        if not tables.n_forms.sum():
+            continue
+        point = weighted_features(tables, np.ones((1, store.n_glosses)))
+        replicates = weighted_features(tables, weights)
+        out[family] = PhonotacticPrior(
+            family, languages, int(tables.n_forms.sum()),
+            {f: float(point[f][0]) for f in FEATURES},
+            {f: float(np.nanstd(replicates[f], ddof=1)) for f in FEATURES})
+    return out
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Incremental Row Cache
+=====================
+Content-hashed caches of per-row results, so a re-run only reprocesses
+the wordlist rows whose cells changed.
+
+Each row is keyed on its entry number (plus its occurrence, '12#2', when
+a merged wordlist repeats a number) and hashed over its cells. A stage
+hands update() a `derive` function for the changed rows; unchanged rows
+reuse their cached contribution.
+
+RowCache keeps each row's contribution as JSON:
+
+    {'counts':  {name: Counter({key_tuple: n, ...})},
+     'records': {name: [dict, ...]}}
+
+Aggregated counts are kept in the cache and patched by subtracting the old
+contribution of changed or removed rows and adding the new one.
+parse_isthmus_data.py builds its exported files this way.
+
+RowTable keeps the records of every row as NumPy columns in an .npz
+file, with a 'row' column giving each record's row. advanced_analysis.py
+uses it for the alignment stages: the correspondence columns and the
+cognate screen hits of a gloss are only recomputed when that gloss's
+segmented forms (or loan marks) changed, on a FormStore subset of the
+changed glosses.
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+KEY_SEP = '\t'
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def row_key(entry: Dict) -> str:
+    """Key for an entry: its number, or its gloss when unnumbered"""
+    if entry.get('id') is not None:
+        return str(int(entry['id']))
+    return 'gloss:' + entry.get('gloss', '')
+
+
+def unique_keys(keys: Iterable[str]) -> List[str]:
+    """Keys made unique by occurrence: a repeated key k becomes k#2, k#3, ..."""
+    seen = Counter()
+    out = []
+    for key in keys:
+        seen[key] += 1
+        out.append(key if seen[key] == 1 else f'{key}#{seen[key]}')
+    return out
+
+
+def row_hash(entry: Dict) -> str:
+    """Hash of the entry number, gloss and all form cells"""
+    payload = json.dumps([entry.get('id'), entry.get('gloss', ''), sorted(entry['forms'].items())],
+                         ensure_ascii=False)
+    return hash_text(payload)
+
+
+def _dump_counts(counts: Dict[str, Counter]) -> Dict:
+    return {name: {KEY_SEP.join(key): n for key, n in counter.items()}
+            for name, counter in counts.items()}
+
+
+def _load_counts(raw: Dict) -> Dict[str, Counter]:
+    return {name: Counter({tuple(key.split(KEY_SEP)): n for key, n in counter.items()})
+            for name, counter in raw.items()}
+
+
+class UpdateStats(NamedTuple):
+    reused: int
+    changed: int
+    removed: int
+
+
+class RowCache:
+    """Per-row contributions plus patched aggregates, persisted as JSON"""
+
+    def __init__(self, path: str, version: str = '1'):
+        self.path = path
+        self.version = version
+        self.rows = {}
+        self.totals = {}
+        self.order = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == version:
+                self.rows = cached['rows']
+                self.totals = _load_counts(cached['totals'])
+
+    def _apply(self, contribution: Dict, sign: int):
+        for name, counter in _load_counts(contribution.get('counts', {})).items():
+            total = self.totals.setdefault(name, Counter())
+            for key, n in counter.items():
+                total[key] += sign * n
+                if total[key] <= 0:
+                    del total[key]
+
+    def update(self, entries: Sequence[Dict], derive: Callable[[int], Dict]) -> UpdateStats:
+        """Bring the cache in line with `entries`; derive(i) is called only for changed entries[i]"""
+        keys = unique_keys(row_key(entry) for entry in entries)
+        self.order = keys
+        reused = changed = 0
+        for i, (key, entry) in enumerate(zip(keys, entries)):
+            digest = row_hash(entry)
+            cached = self.rows.get(key)
+            if cached is not None and cached['hash'] == digest:
+                reused += 1
+                continue
+            if cached is not None:
+                self._apply(cached['contribution'], -1)
+            result = derive(i)
+            contribution = {
+                'counts': _dump_counts(result.get('counts', {})),
+                'records': result.get('records', {}),
+            }
+            self.rows[key] = {'hash': digest, 'contribution': contribution}
+            self._apply(contribution, +1)
+            changed += 1
+
+        current = set(keys)
+        removed = [key for key in self.rows if key not in current]
+        for key in removed:
+            self._apply(self.rows.pop(key)['contribution'], -1)
+        return UpdateStats(reused, changed, len(removed))
+
+    def counts(self, name: str) -> Counter:
+        """Aggregated counts over all rows, keyed by tuple"""
+        return Counter(self.totals.get(name, Counter()))
+
+    def records(self, name: str) -> List[Dict]:
+        """Concatenated per-row records, in wordlist order"""
+        out = []
+        for key in self.order:
+            out.extend(self.rows[key]['contribution']['records'].get(name, []))
+        return out
+
+    def is_current(self, entries: Sequence[Dict]) -> bool:
+        """True if every row hash matches and no rows were added or removed"""
+        keys = unique_keys(row_key(entry) for entry in entries)
+        for key, entry in zip(keys, entries):
+            cached = self.rows.get(key)
+            if cached is None or cached['hash'] != row_hash(entry):
+                return False
+        return set(keys) == set(self.rows)
+
+    def save(self, path: Optional[str] = None):
+        with open(path or self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'rows': self.rows,
+                       'totals': _dump_counts(self.totals)}, f, ensure_ascii=False)
+
+
+class RowTable:
+    """Per-row records as NumPy columns ('row' = position of the record's row), persisted as .npz"""
+
+    def __init__(self, path: str, version: str = '1'):
+        self.path = path
+        self.version = version
+        self.keys: List[str] = []
+        self.hashes: List[str] = []
+        self.columns: Dict[str, np.ndarray] = {}
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as cached:
+                if str(cached['version']) == version:
+                    self.keys = [str(k) for k in cached['keys']]
+                    self.hashes = [str(h) for h in cached['hashes']]
+                    self.columns = {name[len('column/'):]: cached[name]
+                                    for name in cached.files if name.startswith('column/')}
+
+    def update(self, keys: Sequence[str], hashes: Sequence[str],
+               derive: Callable[[np.ndarray], Dict[str, np.ndarray]]) -> UpdateStats:
+        """
+        Bring the table in line with rows `keys` (hashed as `hashes`).
+        derive(rows) returns the columns of the records of those row
+        positions, 'row' included; it is called once, for the changed rows.
+        """
+        previous = {key: (i, digest) for i, (key, digest) in enumerate(zip(self.keys, self.hashes))}
+        # Old position of every kept row, -1 for changed ones
+        old_row = np.full(len(keys), -1, dtype=np.int64)
+        for i, (key, digest) in enumerate(zip(keys, hashes)):
+            cached = previous.get(key)
+            if cached is not None and cached[1] == digest:
+                old_row[i] = cached[0]
+        changed = np.flatnonzero(old_row < 0)
+
+        parts = []
+        if self.columns:
+            new_row = np.full(len(self.keys), -1, dtype=np.int64)
+            kept = old_row >= 0
+            new_row[old_row[kept]] = np.flatnonzero(kept)
+            rows = new_row[self.columns['row']]
+            keep = rows >= 0
+            parts.append(dict({name: column[keep] for name, column in self.columns.items()},
+                              row=rows[keep]))
+        if len(changed) or not parts:
+            parts.append(derive(changed))
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[-1]}
+        # Records in row order; a row's records come from one part, in their order
+        order = np.argsort(columns['row'], kind='stable')
+        self.columns = {name: column[order] for name, column in columns.items()}
+
+        removed = len(set(previous) - set(keys))
+        self.keys, self.hashes = list(keys), list(hashes)
+        return UpdateStats(len(keys) - len(changed), len(changed), removed)
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        arrays = {'version': np.array(self.version), 'keys': np.array(self.keys, dtype=str),
+                  'hashes': np.array(self.hashes, dtype=str)}
+        arrays.update({f'column/{name}': column for name, column in self.columns.items()})
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
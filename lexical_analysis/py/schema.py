@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Wordlist Schema Registry
+========================
+The one place that says which columns the comparative wordlist has: the
+short variety ID used throughout the analysis, its display name, family
+and branch, and its orthography profile for segmentation.
+
+Columns are matched on their language-group header plus their slot under
+it. The CSV leaves the header blank for a second variety of a group
+(Tlaxiaco Mixtec after "Mixtec languages", Xhon Zapotec after "Zapotec
+languages"); those are slot 1 of the group, whatever position they end up
+at. The second header row is checked against each variety's expected
+description, so a shifted or unknown column fails at load time instead of
+producing empty tables downstream.
+"""
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+# Bump when variety IDs or column resolution change (invalidates caches)
+SCHEMA_VERSION = '1'
+
+
+class SchemaError(ValueError):
+    """The wordlist or a requested column does not match the schema"""
+
+
+class Variety(NamedTuple):
+    id: str
+    header: str
+    slot: int
+    name: str
+    family: str
+    branch: Optional[str]
+    description: str
+    profile: str = 'default'
+
+
+META_HEADERS = {'№': 'entry_num', 'English': 'gloss'}
+
+FAMILIES = ('Otomanguean', 'Mixe-Zoquean', 'Totonacan', 'Huavean', 'Tequistlatecan')
+
+VARIETIES = (
+    Variety('otomian', 'Otomian languages', 0, 'Otomian',
+            'Otomanguean', 'Oto-Pamean', '(various)'),
+    Variety('trique', 'Trique languages', 0, 'Trique',
+            'Otomanguean', 'Mixtecan', 'San Juan Copala'),
+    Variety('proto_mixtec', 'Mixtec languages', 0, 'Proto-Mixtec',
+            'Otomanguean', 'Mixtecan', 'Proto-Mixtec'),
+    Variety('mixtec_tlaxiaco', 'Mixtec languages', 1, 'Mixtec (Tlaxiaco)',
+            'Otomanguean', 'Mixtecan', 'Tlaxiaco/Putla area Mixtec; unknown dialect'),
+    Variety('zapotec_isthmus', 'Zapotec languages', 0, 'Zapotec (Isthmus)',
+            'Otomanguean', 'Zapotecan', 'Isthmus'),
+    Variety('zapotec_xhon', 'Zapotec languages', 1, 'Zapotec (Xhon)',
+            'Otomanguean', 'Zapotecan', 'Xhon'),
+    Variety('mazahua', 'Mazahua languages', 0, 'Mazahua',
+            'Otomanguean', 'Oto-Pamean', 'Michoacan, Central'),
+    Variety('totonac', 'Totonac languages', 0, 'Totonac',
+            'Totonacan', None, '(various)'),
+    Variety('popoluca', 'Popoluca languages', 0, 'Popoluca',
+            'Mixe-Zoquean', None, '(various)'),
+    Variety('huave', 'Huave languages', 0, 'Huave',
+            'Huavean', None, '(various)'),
+    Variety('chontal', 'Chontal languages', 0, 'Chontal',
+            'Tequistlatecan', None, '(various)'),
+)
+
+VARIETY_BY_ID: Dict[str, Variety] = {v.id: v for v in VARIETIES}
+_BY_HEADER = {(v.header, v.slot): v for v in VARIETIES}
+
+# Column keys written by earlier versions of the parser (pandas' names
+# for the blank headers) -> variety ID
+LEGACY_ALIASES = {
+    'Unnamed: 5': 'mixtec_tlaxiaco',
+    'Unnamed: 7': 'zapotec_xhon',
+}
+
+
+def _normalized(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def resolve_columns(headers: Sequence[str], descriptions: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Column IDs for the CSV's language-group header row. `descriptions` is
+    the second header row; when given, each variety's description must
+    match. Raises SchemaError for unknown, duplicate or mismatched columns.
+    """
+    columns = []
+    group, slot = None, 0
+    for i, header in enumerate(headers):
+        header = header.strip()
+        if header in META_HEADERS:
+            columns.append(META_HEADERS[header])
+            group = None
+            continue
+        if header:
+            group, slot = header, 0
+        elif group is not None:
+            slot += 1
+        variety = _BY_HEADER.get((group, slot))
+        if variety is None:
+            if header:
+                label = repr(header)
+            elif group is not None:
+                label = f'blank header after {group!r}'
+            else:
+                label = 'blank header'
+            raise SchemaError(f"column {i} ({label}) is not in the wordlist schema")
+        if variety.id in columns:
+            raise SchemaError(f"column {i} maps to {variety.id!r} twice")
+        if descriptions is not None and i < len(descriptions) and descriptions[i].strip():
+            found = _normalized(descriptions[i])
+            if found != _normalized(variety.description):
+                raise SchemaError(f"column {i} ({variety.id}): expected variety "
+                                  f"{variety.description!r}, found {descriptions[i].strip()!r}")
+        columns.append(variety.id)
+    return columns
+
+
+def canonical_id(name: str) -> str:
+    """Variety ID for an ID, a legacy column key or a group header"""
+    if name in VARIETY_BY_ID or name in META_HEADERS.values():
+        return name
+    if name in LEGACY_ALIASES:
+        return LEGACY_ALIASES[name]
+    variety = _BY_HEADER.get((name.strip(), 0))
+    if variety is not None:
+        return variety.id
+    raise SchemaError(f"unknown language column: {name!r}")
+
+
+def check_languages(requested: Iterable[str], available: Sequence[str]) -> List[str]:
+    """Canonical IDs of `requested`, all of which must be among `available`"""
+    requested = [canonical_id(lang) for lang in requested]
+    missing = [lang for lang in requested if lang not in available]
+    if missing:
+        raise SchemaError(f"language column(s) not in this wordlist: {', '.join(missing)}")
+    return requested
+
+
+def display_name(variety_id: str) -> str:
+    return VARIETY_BY_ID[canonical_id(variety_id)].name
+
+
+def family_of(variety_id: str) -> str:
+    return VARIETY_BY_ID[canonical_id(variety_id)].family
+
+
+def languages_in(family: str, branch: Optional[str] = None) -> List[str]:
+    """Variety IDs of a family (optionally one branch), in schema order"""
+    return [v.id for v in VARIETIES
+            if v.family == family and (branch is None or v.branch == branch)]
+
+
+def family_tree() -> Dict:
+    """{family: [ids]} or {family: {branch: [ids]}} for families with branches"""
+    tree = {}
+    for family in FAMILIES:
+        members = [v for v in VARIETIES if v.family == family]
+        if any(v.branch for v in members):
+            branches = {}
+            for v in members:
+                branches.setdefault(v.branch, []).append(v.id)
+            tree[family] = branches
+        else:
+            tree[family] = [v.id for v in members]
+    return tree
+
+
+def orthography_profiles() -> Dict[str, str]:
+    """Variety ID -> orthography profile, for varieties not using 'default'"""
+    return {v.id: v.profile for v in VARIETIES if v.profile != 'default'}
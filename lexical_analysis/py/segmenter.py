@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Form Segmenter
+==============
+Splits transcribed forms into phonemic segments. Shared by
+advanced_analysis.py and the Swadesh notebook so both segment identically.
+
+Multigraphs come from a per-language grapheme inventory (orthography
+profile) compiled into a trie. Each form is segmented in a single
+left-to-right pass with guaranteed longest match, so overlapping
+multigraphs no longer depend on list order. Combining diacritics are
+attached to the segment they follow.
+
+segment() goes through one bounded LRU cache keyed by (raw form,
+orthography profile), shared by every stage in the process, with segment
+strings interned so repeated segments share one object. cache_info()
+reports hits and misses.
+"""
+
+import re
+import sys
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+from schema import orthography_profiles
+
+# Common digraphs/trigraphs in Mesoamerican orthographies: the list of
+# advanced_analysis.py, which also covers the shorter list the Swadesh
+# notebook used ('ch', 'ts', 'tz', 'dz', 'nd', 'mb', 'ng', 'nh', 'xh',
+# 'qu', 'gu', 'hu'). The notebook therefore also treats 'ñh', 'th', 'ph',
+# 'kh', 'tx', 'dj', 'nz' and 'ny' as single segments.
+DEFAULT_GRAPHEMES = ('ts', 'tz', 'ch', 'dz', 'gu', 'qu', 'hu', 'ng', 'ñh', 'xh',
+                     'nd', 'mb', 'nh', 'th', 'ph', 'kh', 'tx', 'dj', 'nz', 'ny')
+
+# Orthography profile name -> multigraph inventory. Only 'default' is
+# defined so far: every variety is segmented with the same pan-Mesoamerican
+# list, so e.g. Zapotec 'dx' or Totonac 'tl' and 'lh' are split into two
+# segments. Per-variety inventories go here, selected through
+# schema.VARIETIES.
+ORTHOGRAPHY_PROFILES = {
+    'default': DEFAULT_GRAPHEMES,
+}
+
+# Language column -> orthography profile (languages not listed use 'default');
+# set per variety in schema.VARIETIES
+LANGUAGE_PROFILES: Dict[str, str] = orthography_profiles()
+
+# Non-letters kept as segments (glottal stop notations)
+GLOTTAL_MARKS = "'ʔʼˀ"
+
+_END = ''
+
+
+def normalize_form(text: str) -> str:
+    """Normalize a linguistic form for comparison"""
+    if not text:
+        return ''
+    # Remove parenthetical notes
+    text = re.sub(r'\([^)]*\)', '', text)
+    # Remove reconstruction asterisks
+    text = re.sub(r'\*', '', text)
+    # Normalize whitespace
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def _is_mark(char: str) -> bool:
+    return unicodedata.category(char).startswith('M')
+
+
+class Segmenter:
+    """Longest-match segmenter over a fixed grapheme inventory"""
+
+    def __init__(self, graphemes: Iterable[str] = DEFAULT_GRAPHEMES,
+                 keep: str = GLOTTAL_MARKS):
+        self.graphemes = tuple(graphemes)
+        self.keep = keep
+        self.trie = {}
+        for grapheme in self.graphemes:
+            node = self.trie
+            for char in grapheme.lower():
+                node = node.setdefault(char, {})
+            node[_END] = True
+
+    def segment(self, text: str) -> Tuple[str, ...]:
+        """Segment one form (uncached; see the module-level segment())"""
+        text = normalize_form(text)
+        if not text:
+            return ()
+        lower = text.lower()
+        if len(lower) != len(text):
+            lower = ''.join(c.lower()[0] for c in text)
+
+        segments = []
+        n = len(text)
+        i = 0
+        while i < n:
+            char = lower[i]
+            # Skip non-letter characters but keep glottal markers
+            if not char.isalpha() and char not in self.keep:
+                i += 1
+                continue
+
+            # Longest multigraph starting at i (a single character otherwise)
+            end = i + 1
+            node = self.trie
+            j = i
+            while j < n and lower[j] in node:
+                node = node[lower[j]]
+                j += 1
+                if _END in node:
+                    end = j
+
+            # Include any following diacritics
+            while end < n and _is_mark(text[end]):
+                end += 1
+            segments.append(sys.intern(lower[i:end]))
+            i = end
+        return tuple(segments)
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+
+class SegmentCache:
+    """Bounded LRU mapping (form, profile) -> segment tuple"""
+
+    def __init__(self, maxsize: int = 200_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable, compute):
+        data = self._data
+        try:
+            value = data[key]
+        except KeyError:
+            self.misses += 1
+            value = compute()
+            data[key] = value
+            if len(data) > self.maxsize:
+                data.popitem(last=False)
+            return value
+        self.hits += 1
+        data.move_to_end(key)
+        return value
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, len(self._data), self.maxsize)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+
+SEGMENT_CACHE = SegmentCache()
+
+
+def profile_for(lang: Optional[str]) -> str:
+    """Orthography profile name used for a language column"""
+    if lang is None:
+        return 'default'
+    return LANGUAGE_PROFILES.get(lang, 'default')
+
+
+@lru_cache(maxsize=None)
+def get_segmenter(profile: str = 'default') -> Segmenter:
+    """Shared Segmenter for an orthography profile"""
+    return Segmenter(ORTHOGRAPHY_PROFILES[profile])
+
+
+def segment(form: str, lang: Optional[str] = None) -> Tuple[str, ...]:
+    """Segment a form with the orthography profile of `lang` (cached)"""
+    if not form:
+        return ()
+    profile = profile_for(lang)
+    return SEGMENT_CACHE.get((form, profile), lambda: get_segmenter(profile).segment(form))
+
+
+def cache_info() -> CacheInfo:
+    """Hit/miss counters of the shared segmentation cache"""
+    return SEGMENT_CACHE.info()
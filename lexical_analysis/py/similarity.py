@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Bulk Form Similarity
+====================
+Segment-set Jaccard similarity for every gloss and language pair at once.
+
+Each cell of a FormStore is turned into a packed bit vector over the
+segment vocabulary (uint64 blocks, bit i set when segment i occurs in the
+form). For a language pair the intersection and union sizes of all glosses
+are then popcounts of `a & b` and `a | b`, so a full gloss × pair matrix
+costs a handful of array operations instead of two Python sets per cell.
+"""
+
+from itertools import combinations
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from formstore import FormStore
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        as_bytes = words.view(np.uint8).reshape(words.shape + (8,))
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+class SimilarPair(NamedTuple):
+    gloss: int
+    lang1: str
+    lang2: str
+    similarity: float
+
+
+def segment_bitsets(store: FormStore) -> np.ndarray:
+    """gloss × language × block uint64 array of packed segment sets"""
+    n_langs = len(store.languages)
+    n_cells = store.n_glosses * n_langs
+    n_blocks = max(1, (store.n_segments + 63) // 64)
+    # Cell of every entry in store.ids
+    seg_per_cell = np.diff(store.offsets[store.cell_offsets])
+    cell_of = np.repeat(np.arange(n_cells), seg_per_cell)
+    ids = store.ids.astype(np.int64)
+    bits = np.zeros((n_cells, n_blocks), dtype=np.uint64)
+    np.bitwise_or.at(bits, (cell_of, ids >> 6), np.left_shift(np.uint64(1), (ids & 63).astype(np.uint64)))
+    return bits.reshape(store.n_glosses, n_langs, n_blocks)
+
+
+def jaccard_matrix(store: FormStore, pairs: Optional[Sequence[Tuple[str, str]]] = None,
+                   bitsets: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    gloss × pair Jaccard similarities for `pairs` of language columns (all
+    pairs by default). Cells where either form is missing are 0.
+    """
+    if pairs is None:
+        pairs = list(combinations(store.languages, 2))
+    if bitsets is None:
+        bitsets = segment_bitsets(store)
+    left = bitsets[:, [store.lang_index[a] for a, _ in pairs]]
+    right = bitsets[:, [store.lang_index[b] for _, b in pairs]]
+    inter = _popcount(left & right).sum(axis=-1, dtype=np.int64)
+    union = _popcount(left | right).sum(axis=-1, dtype=np.int64)
+    both = _popcount(left).any(axis=-1) & _popcount(right).any(axis=-1)
+    sims = np.zeros(inter.shape)
+    np.divide(inter, union, out=sims, where=both)
+    return sims
+
+
+def similar_pairs(store: FormStore, pairs: Sequence[Tuple[str, str]],
+                  threshold: float = 0.4, exclude: Optional[np.ndarray] = None,
+                  measure: Optional[Callable[[FormStore, Sequence[Tuple[str, str]]], np.ndarray]] = None
+                  ) -> Iterator[SimilarPair]:
+    """
+    Every (gloss, language pair) with similarity above `threshold`, in gloss
+    order. `exclude` is an optional gloss × language mask of cells to skip
+    (e.g. forms marked as loans). `measure(store, pairs)` returns the gloss ×
+    pair similarities (jaccard_matrix by default; see also
+    alignment.alignment_similarity).
+    """
+    pairs = list(pairs)
+    sims = (measure or jaccard_matrix)(store, pairs)
+    hits = sims > threshold
+    if exclude is not None:
+        left = exclude[:, [store.lang_index[a] for a, _ in pairs]]
+        right = exclude[:, [store.lang_index[b] for _, b in pairs]]
+        hits &= ~(left | right)
+    for gloss, p in zip(*np.nonzero(hits)):
+        lang1, lang2 = pairs[p]
+        yield SimilarPair(int(gloss), lang1, lang2, float(sims[gloss, p]))
+
+
+def cross_pairs(families: Sequence[Tuple[str, List[str], str, List[str]]],
+                languages: Sequence[str]) -> List[Tuple[str, str]]:
+    """Language pairs across (family1, langs1, family2, langs2) entries, limited to `languages`"""
+    available = set(languages)
+    out = []
+    for _, langs1, _, langs2 in families:
+        for a in langs1:
+            for b in langs2:
+                if a in available and b in available and (a, b) not in out:
+                    out.append((a, b))
+    return out
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Sound-Change Mining
+===================
+Reflexes of proto-segments in daughter columns, with their environments.
+
+The first variant of every reconstructed form is aligned to the first
+variant of the same gloss in each daughter column with the sound-class
+aligner (alignment.py); all reconstructions × daughters go through one
+batched alignment. Every proto-segment then has a reflex: the daughter
+segment aligned with it, or DELETED when the alignment has a gap there
+(daughter insertions have no proto-segment and are not counted).
+
+Counts are kept in arrays over segment IDs:
+
+    counts   daughter × proto segment × reflex
+    left     daughter × proto segment × reflex × class of the preceding segment
+    right    daughter × proto segment × reflex × class of the following segment
+
+Environments are sound classes (V, P, T, ...) of the neighbouring
+proto-segments, or BOUNDARY at the edge of the form. Rules are ranked by
+support: a plain rule *x > y for each frequent reflex, and a conditioned
+rule *x > y / env whenever y is not the usual reflex of *x but recurs in
+one environment, and is more reliable there than across all of *x.
+"""
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from alignment import SoundClassAligner, sound_class
+from correspondences import first_variants
+from formstore import FormStore
+
+BOUNDARY = '#'
+DELETED = '∅'
+
+
+class SoundChangeRule(NamedTuple):
+    daughter: str
+    proto: str
+    reflex: str
+    environment: str
+    support: int
+    total: int
+
+    @property
+    def reliability(self) -> float:
+        """Share of the proto-segment's occurrences (in this environment) with this reflex"""
+        return self.support / self.total if self.total else 0.0
+
+    def __str__(self) -> str:
+        env = f" / {self.environment}" if self.environment else ''
+        return f"*{self.proto} > {self.reflex}{env}"
+
+
+class SoundChangeCounts:
+    """Reflex counts of proto-segments per daughter, plain and by environment"""
+
+    def __init__(self, store: FormStore, proto: str, daughters: Sequence[str],
+                 environments: Sequence[str], counts: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, alignments: int):
+        self.store = store
+        self.proto = proto
+        self.daughters = list(daughters)
+        self.environments = list(environments)
+        self.counts = counts
+        self.left = left
+        self.right = right
+        self.alignments = alignments
+
+    def reflex_label(self, reflex: int) -> str:
+        return DELETED if reflex == self.store.n_segments else self.store.segments[reflex]
+
+    def reflexes(self, daughter: str, proto_seg: str) -> List[Tuple[str, int]]:
+        """(reflex, count) of one proto-segment in one daughter, most frequent first"""
+        row = self.counts[self.daughters.index(daughter), self.store.segment_index[proto_seg]]
+        order = np.lexsort((np.arange(len(row)), -row))
+        return [(self.reflex_label(r), int(row[r])) for r in order if row[r]]
+
+    def rules(self, min_support: int = 2, conditioned: bool = True) -> List[SoundChangeRule]:
+        """Plain and environment-conditioned rules with at least `min_support` cases, best first"""
+        out = []
+        totals = self.counts.sum(axis=2)
+        for d, x, y in zip(*np.nonzero(self.counts >= min_support)):
+            out.append(SoundChangeRule(self.daughters[d], self.store.segments[x], self.reflex_label(y),
+                                       '', int(self.counts[d, x, y]), int(totals[d, x])))
+        if conditioned:
+            usual = self.counts.argmax(axis=2)
+            for table, template in ((self.left, '{} _'), (self.right, '_ {}')):
+                env_totals = table.sum(axis=2)
+                hits = table >= min_support
+                hits &= np.arange(table.shape[2])[None, None, :, None] != usual[:, :, None, None]
+                # Environment must raise the reflex's share (a*D > b*C for a/b > C/D)
+                hits &= (table * totals[:, :, None, None]
+                         > self.counts[..., None] * env_totals[:, :, None, :])
+                for d, x, y, e in zip(*np.nonzero(hits)):
+                    out.append(SoundChangeRule(self.daughters[d], self.store.segments[x],
+                                               self.reflex_label(y),
+                                               template.format(self.environments[e]),
+                                               int(table[d, x, y, e]), int(env_totals[d, x, e])))
+        out.sort(key=lambda rule: (-rule.support, -rule.reliability, rule.daughter, str(rule)))
+        return out
+
+
+def mine_sound_changes(store: FormStore, proto: str, daughters: Sequence[str],
+                       aligner: Optional[SoundClassAligner] = None) -> SoundChangeCounts:
+    """Align every reconstruction of `proto` to each daughter and count reflexes by environment"""
+    aligner = aligner or SoundClassAligner(store)
+    n_seg, n_daughters = store.n_segments, len(daughters)
+
+    classes = {}
+    class_of = np.array([classes.setdefault(sound_class(seg), len(classes)) for seg in store.segments],
+                        dtype=np.int64)
+    environments = list(classes) + [BOUNDARY]
+    boundary = len(environments) - 1
+
+    proto_rows = first_variants(store, proto)
+    rows_a, rows_b, daughter_of = [], [], []
+    for d, daughter in enumerate(daughters):
+        rows = first_variants(store, daughter)
+        both = (proto_rows >= 0) & (rows >= 0)
+        rows_a.append(proto_rows[both])
+        rows_b.append(rows[both])
+        daughter_of.append(np.full(both.sum(), d, dtype=np.int64))
+    rows_a = np.concatenate(rows_a)
+    rows_b = np.concatenate(rows_b)
+    daughter_of = np.concatenate(daughter_of)
+
+    # Every proto-segment of every aligned pair, deleted unless aligned below
+    lengths = store.offsets[rows_a + 1] - store.offsets[rows_a]
+    token_start = np.concatenate([[0], np.cumsum(lengths)])
+    pair = np.repeat(np.arange(len(rows_a)), lengths)
+    i = np.arange(token_start[-1]) - token_start[pair]
+    ids = store.ids[store.offsets[rows_a][pair] + i].astype(np.int64)
+    reflex = np.full(len(ids), n_seg, dtype=np.int64)
+    k, pos, _, seg_b = aligner.aligned_segments(rows_a, rows_b)
+    reflex[token_start[k] + pos] = seg_b
+
+    length = lengths[pair]
+    cls = class_of[ids]
+    left_env = np.where(i == 0, boundary, np.roll(cls, 1))
+    right_env = np.where(i == length - 1, boundary, np.roll(cls, -1))
+
+    n_env = len(environments)
+    base = (daughter_of[pair] * n_seg + ids) * (n_seg + 1) + reflex
+    counts = np.bincount(base, minlength=n_daughters * n_seg * (n_seg + 1))
+    left = np.bincount(base * n_env + left_env, minlength=n_daughters * n_seg * (n_seg + 1) * n_env)
+    right = np.bincount(base * n_env + right_env, minlength=n_daughters * n_seg * (n_seg + 1) * n_env)
+    shape = (n_daughters, n_seg, n_seg + 1)
+    return SoundChangeCounts(store, proto, daughters, environments, counts.reshape(shape),
+                             left.reshape(shape + (n_env,)), right.reshape(shape + (n_env,)),
+                             len(rows_a))
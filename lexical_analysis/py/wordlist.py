@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Isthmus Wordlist Loader
+=======================
+Streaming access to the comparative wordlist (Isthmus_script_languages.csv).
+
+The CSV has two header rows: the language-group header and a second row
+naming the variety of each column. Everything after that is one gloss per
+row. WordlistLoader reads the headers once, resolves them to variety IDs
+through schema.py (failing on unknown or shifted columns), and yields
+typed Entry records lazily, so downstream jobs can start consuming rows
+before the whole file has been parsed.
+
+Example:
+    loader = WordlistLoader('Isthmus_script_languages.csv')
+    for entry in loader:
+        print(entry.entry_num, entry.gloss, entry.forms.get('popoluca'))
+"""
+
+import csv
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from schema import check_languages, resolve_columns
+
+META_COLUMNS = ('entry_num', 'gloss')
+
+
+class Entry(NamedTuple):
+    """One gloss of the wordlist with its non-empty forms per language"""
+    entry_num: Optional[int]
+    gloss: str
+    forms: Dict[str, str]
+
+    def to_dict(self) -> Dict:
+        """Entry in the isthmus_parsed.json layout"""
+        return {'id': self.entry_num, 'gloss': self.gloss, 'forms': dict(self.forms)}
+
+
+def _parse_entry_num(value: str) -> Optional[int]:
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+class WordlistLoader:
+    """Lazy reader for the comparative wordlist CSV"""
+
+    def __init__(self, path: str = 'Isthmus_script_languages.csv',
+                 encoding: str = 'utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self._raw_columns = None
+        self._columns = None
+        self._varieties = None
+
+    def _read_header(self):
+        with open(self.path, 'r', encoding=self.encoding, newline='') as f:
+            reader = csv.reader(f)
+            raw = next(reader)
+            variety_row = next(reader, [])
+        variety_row = variety_row + [''] * (len(raw) - len(variety_row))
+        self._raw_columns = [h if h.strip() else f'Unnamed: {i}' for i, h in enumerate(raw)]
+        self._columns = resolve_columns(raw, variety_row)
+        self._varieties = {col: variety_row[i].strip()
+                           for i, col in enumerate(self._columns)
+                           if variety_row[i].strip()}
+
+    @property
+    def raw_columns(self) -> List[str]:
+        """Column headers as they appear in the CSV"""
+        if self._raw_columns is None:
+            self._read_header()
+        return list(self._raw_columns)
+
+    @property
+    def columns(self) -> List[str]:
+        """Variety IDs of the columns (see schema.py)"""
+        if self._columns is None:
+            self._read_header()
+        return list(self._columns)
+
+    @property
+    def languages(self) -> List[str]:
+        """Language columns (everything except entry number and gloss)"""
+        return [c for c in self.columns if c not in META_COLUMNS]
+
+    @property
+    def varieties(self) -> Dict[str, str]:
+        """Variety description for each column, from the second header row"""
+        if self._varieties is None:
+            self._read_header()
+        return dict(self._varieties)
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        """Yield every data row as {column: raw cell}, including empty cells"""
+        columns = self.columns
+        with open(self.path, 'r', encoding=self.encoding, newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # language-group header
+            next(reader, None)  # variety row
+            for raw in reader:
+                if not any(cell.strip() for cell in raw):
+                    continue
+                raw = raw + [''] * (len(columns) - len(raw))
+                yield dict(zip(columns, raw))
+
+    def entries(self, languages: Optional[Iterable[str]] = None) -> Iterator[Entry]:
+        """
+        Yield Entry records, optionally projected onto a subset of languages.
+
+        Only non-empty cells are kept in Entry.forms; newlines in glosses
+        are folded into spaces.
+        """
+        wanted = self.languages if languages is None else check_languages(languages, self.languages)
+        for row in self.rows():
+            forms = {}
+            for lang in wanted:
+                value = row.get(lang, '')
+                if value.strip():
+                    forms[lang] = value
+            yield Entry(
+                entry_num=_parse_entry_num(row.get('entry_num', '')),
+                gloss=row.get('gloss', '').replace('\n', ' '),
+                forms=forms,
+            )
+
+    def __iter__(self) -> Iterator[Entry]:
+        return self.entries()
+
+
+def load_entries(path: str = 'Isthmus_script_languages.csv') -> List[Entry]:
+    """Read the whole wordlist into a list of entries"""
+    return list(WordlistLoader(path))
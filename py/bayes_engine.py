@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Bayesian Model Comparison Engine
+================================
+Log evidence of script features under each language family's phonotactic
+priors, shared by isthmian_bayesian_with_maya_comparison.ipynb and
+maya_bayesian_validation_colab.ipynb.
+
+Each feature is compared under Normal-Normal conjugacy:
+
+    log e = -1/2 log(2π (σ²_prior + σ²_lik)) - (obs - μ_prior)² / 2 (σ²_prior + σ²_lik)
+
+and a family's evidence is the weighted sum over features. The prior
+table is held as a families × features array, so the log evidence of
+every family and feature is one broadcast. Observations can be a single
+feature dict or a batch (a list of dicts, a DataFrame or an N × features
+array), which scores thousands of resampled corpora in one call.
+
+The prior mean segment length is rescaled by each observation's
+seg_len_mean / `length_reference` (the notebooks' scaling factor), so
+families are compared on relative segment length.
+
+    model = BayesModel(PHONOTACTIC_PRIORS, FEATURE_UNCERTAINTIES, FEATURE_WEIGHTS,
+                       length_reference=3.45)
+    comparison = model.compare(observed)
+    comparison.ranking()
+"""
+
+import math
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Feature whose prior is rescaled by the observed/reference length ratio
+SCALED_FEATURE = 'seg_len_mean'
+
+# Kass & Raftery (1995) Bayes factor thresholds
+BF_STRENGTHS = ((100.0, 'DECISIVE'), (10.0, 'STRONG'), (3.0, 'MODERATE'))
+
+Observations = Union[Mapping[str, float], Sequence[Mapping[str, float]], np.ndarray]
+
+
+def log_evidence_normal(observed, prior_mean, prior_std, lik_std):
+    """Log evidence of `observed` under a Normal prior and likelihood (broadcasts over arrays)"""
+    total_var = np.square(prior_std) + np.square(lik_std)
+    return -0.5 * np.log(2 * np.pi * total_var) - 0.5 * np.square(observed - prior_mean) / total_var
+
+
+def bayes_factor(log_bf: float) -> float:
+    """exp(log_bf), capped to stay finite"""
+    return math.exp(min(log_bf, 700))
+
+
+def strength(bf: float) -> str:
+    for threshold, label in BF_STRENGTHS:
+        if bf > threshold:
+            return label
+    return 'WEAK'
+
+
+class Comparison(NamedTuple):
+    """Evidence of one observation under every family"""
+    families: List[str]
+    features: List[str]
+    observed: np.ndarray
+    prior: np.ndarray
+    log_e: np.ndarray
+    weighted: np.ndarray
+    total: np.ndarray
+
+    def ranking(self) -> List[Tuple[str, float]]:
+        """(family, total log evidence), best first"""
+        order = np.argsort(-self.total, kind='stable')
+        return [(self.families[i], float(self.total[i])) for i in order]
+
+    def bayes_factors(self) -> List[Tuple[str, float, str]]:
+        """(family, BF of the best family against it, strength) for the other families"""
+        ranked = self.ranking()
+        best = ranked[0][1]
+        return [(family, bayes_factor(best - total), strength(bayes_factor(best - total)))
+                for family, total in ranked[1:]]
+
+    def results(self) -> Dict[str, Dict]:
+        """{family: {'total', 'features': {feature: {'prior', 'observed', 'log_e', 'weighted'}}}}"""
+        out = {}
+        for f, family in enumerate(self.families):
+            features = {}
+            for k, feature in enumerate(self.features):
+                if np.isnan(self.log_e[f, k]):
+                    continue
+                features[feature] = {'prior': float(self.prior[f, k]),
+                                     'observed': float(self.observed[k]),
+                                     'log_e': float(self.log_e[f, k]),
+                                     'weighted': float(self.weighted[f, k])}
+            out[family] = {'total': float(self.total[f]), 'features': features}
+        return out
+
+
+class BayesModel:
+    """Phonotactic prior table of several families, scored against observed features"""
+
+    def __init__(self, priors: Mapping[str, Mapping[str, float]],
+                 uncertainties: Mapping[str, Tuple[float, float]],
+                 weights: Optional[Mapping[str, float]] = None,
+                 length_reference: Optional[float] = None,
+                 prior_sds: Optional[Mapping[str, Mapping[str, float]]] = None):
+        self.families = list(priors)
+        self.features = [feature for feature in uncertainties
+                         if any(feature in p for p in priors.values())]
+        self.length_reference = length_reference
+        # families × features; NaN where a family has no prior for a feature
+        self.means = np.array([[priors[fam].get(feat, np.nan) for feat in self.features]
+                               for fam in self.families], dtype=np.float64)
+        self.feature_prior_std = np.array([uncertainties[feat][0] for feat in self.features],
+                                          dtype=np.float64)
+        self.family_prior_sd = np.array([[(prior_sds or {}).get(fam, {}).get(feat, 0.0)
+                                          for feat in self.features]
+                                         for fam in self.families], dtype=np.float64)
+        # Sampling error of data-derived priors widens the prior
+        self.prior_std = np.hypot(self.feature_prior_std[None, :], self.family_prior_sd)
+        self.lik_std = np.array([uncertainties[feat][1] for feat in self.features], dtype=np.float64)
+        self.weights = np.array([(weights or {}).get(feat, 1.0) for feat in self.features],
+                                dtype=np.float64)
+        self._scaled = self.features.index(SCALED_FEATURE) if SCALED_FEATURE in self.features else None
+
+    def observation_matrix(self, observed: Observations) -> np.ndarray:
+        """N × features array of observations (NaN for features an observation lacks)"""
+        if isinstance(observed, Mapping):
+            observed = [observed]
+        if hasattr(observed, 'to_dict'):
+            observed = observed.to_dict('records')
+        if isinstance(observed, np.ndarray):
+            matrix = np.asarray(observed, dtype=np.float64)
+            return matrix.reshape(-1, len(self.features))
+        return np.array([[row.get(feat, np.nan) for feat in self.features] for row in observed],
+                        dtype=np.float64)
+
+    def scaling_factors(self, obs: np.ndarray) -> np.ndarray:
+        """Observed / reference segment length of each observation (1 without a reference)"""
+        if self.length_reference is None or self._scaled is None:
+            return np.ones(len(obs))
+        return obs[:, self._scaled] / self.length_reference
+
+    def prior_means(self, obs: np.ndarray) -> np.ndarray:
+        """N × families × features prior means after segment-length scaling"""
+        means = np.broadcast_to(self.means, (len(obs),) + self.means.shape).copy()
+        if self._scaled is not None:
+            means[:, :, self._scaled] *= self.scaling_factors(obs)[:, None]
+        return means
+
+    def feature_log_evidence(self, observed: Observations) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(observations, prior means, log evidence) with log evidence N × families × features"""
+        obs = self.observation_matrix(observed)
+        means = self.prior_means(obs)
+        log_e = log_evidence_normal(obs[:, None, :], means, self.prior_std[None], self.lik_std)
+        return obs, means, log_e
+
+    def log_evidence(self, observed: Observations) -> np.ndarray:
+        """N × families weighted total log evidence (features missing on either side are skipped)"""
+        _, _, log_e = self.feature_log_evidence(observed)
+        return np.nansum(log_e * self.weights, axis=-1)
+
+    def log_bayes_factors(self, observed: Observations, reference: str) -> np.ndarray:
+        """N × families log BF of `reference` against each family"""
+        totals = self.log_evidence(observed)
+        return totals[:, [self.families.index(reference)]] - totals
+
+    def winners(self, observed: Observations) -> List[str]:
+        """Best family for each observation"""
+        return [self.families[i] for i in self.log_evidence(observed).argmax(axis=1)]
+
+    def compare(self, observed: Mapping[str, float]) -> Comparison:
+        """Per-feature detail for a single observation"""
+        obs, means, log_e = self.feature_log_evidence(observed)
+        weighted = log_e[0] * self.weights
+        return Comparison(self.families, self.features, obs[0], means[0], log_e[0], weighted,
+                          np.nansum(weighted, axis=-1))
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Script Features
+===============
+The features of the Bayesian notebooks, computed from an integer-coded
+corpus of MS20-delimited segments:
+
+    seg_len_mean, seg_len_cv, max_seg_ratio   segment lengths in tokens
+    initial_entropy, final_entropy            entropy (bits) of first/last legible signs
+    bigram_entropy                            entropy of within-segment sign bigrams
+    freq_concentration                        share of the ten most frequent signs
+
+Signs are integer IDs and each segment is a run of a flat token array.
+Eroded tokens count towards segment length but are skipped as initials
+and finals and left out of bigrams and sign counts; the MS20 ending of a
+segment counts as one sign, as in isthmus_unigram_counts.csv.
+
+Every feature is a function of segment × count tables (FeatureCounts),
+so a weighted corpus (a bootstrap replicate, a subset of texts) is a
+matrix product with a weight matrix, and thousands of corpora are
+featurised at once:
+
+    counts = segment_counts(encode_segments(segments_df))
+    features = script_features(counts.weighted(weights))
+"""
+
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+FEATURES = ('seg_len_mean', 'seg_len_cv', 'max_seg_ratio', 'initial_entropy',
+            'final_entropy', 'bigram_entropy', 'freq_concentration')
+
+BOUNDARY_SIGN = 'MS20'
+ERODED_PREFIX = 'ERODED'
+
+# Signs counted in freq_concentration
+TOP_SIGNS = 10
+
+
+class SegmentTokens(NamedTuple):
+    """Flat integer coding of a segmented corpus (tokens in segment order)"""
+    signs: List[str]
+    ids: np.ndarray
+    segment: np.ndarray
+    eroded: np.ndarray
+    offsets: np.ndarray
+    ending: np.ndarray
+    texts: List[str]
+    text: np.ndarray
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+
+class FeatureCounts(NamedTuple):
+    """Length sums and sign, initial, final and bigram counts (one row per segment or corpus)"""
+    n_segments: np.ndarray
+    length_sum: np.ndarray
+    length_sq: np.ndarray
+    length_max: np.ndarray
+    unigrams: np.ndarray
+    initials: np.ndarray
+    finals: np.ndarray
+    bigrams: np.ndarray
+
+    def total(self) -> 'FeatureCounts':
+        """Counts of the whole corpus (one row)"""
+        return self.weighted(np.ones(len(self.n_segments)))
+
+    def weighted(self, weights: np.ndarray) -> 'FeatureCounts':
+        """Counts of each row of a corpus × segment weight matrix"""
+        weights = np.atleast_2d(weights).astype(np.float64)
+        longest = np.where(weights > 0, self.length_max[None, :], 0.0).max(axis=1)
+        return FeatureCounts(weights @ self.n_segments, weights @ self.length_sum,
+                             weights @ self.length_sq, longest, weights @ self.unigrams,
+                             weights @ self.initials, weights @ self.finals, weights @ self.bigrams)
+
+
+def complement(counts: FeatureCounts) -> FeatureCounts:
+    """Counts of every row but one: row i is the sum of all other rows"""
+    total = counts.total()
+    # The longest segment outside row i is the overall longest unless row i holds it
+    order = np.argsort(-counts.length_max, kind='stable')
+    runner_up = counts.length_max[order[1]] if len(order) > 1 else 0.0
+    longest = np.where(np.arange(len(order)) == order[0], runner_up, counts.length_max[order[0]])
+    return FeatureCounts(*(t - c for t, c in zip(total[:3], counts[:3])), longest,
+                         *(t - c for t, c in zip(total[4:], counts[4:])))
+
+
+def encode_segments(segments_df, token_column: str = 'ms_tokens',
+                    ending_column: Optional[str] = 'has_ms20_ending') -> SegmentTokens:
+    """Integer coding of a segments table (isthmus_segments_by_MS20.csv layout; eroded tokens are -1)"""
+    token_lists = [str(tokens).split() for tokens in segments_df[token_column]]
+    flat = [token for tokens in token_lists for token in tokens]
+    lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    eroded = np.array([token.startswith(ERODED_PREFIX) for token in flat], dtype=bool)
+
+    legible = [token for token, bad in zip(flat, eroded) if not bad]
+    signs, codes = np.unique(np.array(legible + [BOUNDARY_SIGN], dtype=str), return_inverse=True)
+    ids = np.full(len(flat), -1, dtype=np.int64)
+    ids[~eroded] = codes[:-1]
+    if ending_column and ending_column in segments_df:
+        ending = segments_df[ending_column].astype(bool).to_numpy()
+    else:
+        ending = np.zeros(len(lengths), dtype=bool)
+    text_ids = segments_df['text_id'].astype(str) if 'text_id' in segments_df else ['all'] * len(lengths)
+    texts, text = np.unique(np.asarray(text_ids), return_inverse=True)
+    return SegmentTokens(list(signs), ids,
+                         np.repeat(np.arange(len(lengths)), lengths), eroded,
+                         np.concatenate([[0], np.cumsum(lengths)]), ending,
+                         list(texts), text.astype(np.int64))
+
+
+def _table(rows: np.ndarray, cols: np.ndarray, n_rows: int) -> np.ndarray:
+    """rows × distinct-cols matrix counting each (row, col) pair"""
+    _, cols = np.unique(cols, return_inverse=True)
+    n_cols = int(cols.max()) + 1 if len(cols) else 0
+    counts = np.bincount(rows * n_cols + cols, minlength=n_rows * n_cols)
+    return counts.reshape(n_rows, n_cols).astype(np.float64)
+
+
+def edge_tokens(tok: SegmentTokens) -> Tuple[np.ndarray, np.ndarray]:
+    """Index of the first and last legible token of each segment (-1 if none)"""
+    legible = np.flatnonzero(~tok.eroded)
+    n_legible = np.bincount(tok.segment[legible], minlength=tok.n_segments)
+    # Legible tokens are in segment order, so each segment's run starts at its offset
+    offsets = np.concatenate([[0], np.cumsum(n_legible)])
+    has = n_legible > 0
+    first = np.full(tok.n_segments, -1, dtype=np.int64)
+    last = np.full(tok.n_segments, -1, dtype=np.int64)
+    first[has] = legible[offsets[:-1][has]]
+    last[has] = legible[offsets[1:][has] - 1]
+    return first, last
+
+
+def bigram_tokens(tok: SegmentTokens) -> np.ndarray:
+    """Index of every token followed by a legible token of the same segment (itself legible)"""
+    ends = tok.offsets[1:][tok.segment]
+    nxt = np.arange(len(tok.ids)) + 1
+    inside = nxt < ends
+    ok = inside & ~tok.eroded
+    ok[inside] &= ~tok.eroded[nxt[inside]]
+    return np.flatnonzero(ok)
+
+
+def segment_counts(tok: SegmentTokens) -> FeatureCounts:
+    """Per-segment FeatureCounts, with count columns over the sign types that occur"""
+    n_seg, n_signs = tok.n_segments, len(tok.signs)
+    length = tok.lengths.astype(np.float64)
+    first, last = edge_tokens(tok)
+    has_first = first >= 0
+    pairs = bigram_tokens(tok)
+
+    legible = ~tok.eroded
+    boundary = tok.signs.index(BOUNDARY_SIGN)
+    ending = np.flatnonzero(tok.ending)
+    return FeatureCounts(
+        n_segments=np.ones(n_seg),
+        length_sum=length,
+        length_sq=length ** 2,
+        length_max=length,
+        unigrams=_table(np.concatenate([tok.segment[legible], ending]),
+                        np.concatenate([tok.ids[legible], np.full(len(ending), boundary)]), n_seg),
+        initials=_table(np.flatnonzero(has_first), tok.ids[first[has_first]], n_seg),
+        finals=_table(np.flatnonzero(has_first), tok.ids[last[has_first]], n_seg),
+        bigrams=_table(tok.segment[pairs], tok.ids[pairs] * n_signs + tok.ids[pairs + 1], n_seg))
+
+
+def entropy(counts: np.ndarray) -> np.ndarray:
+    """Entropy in bits of each row of a count matrix"""
+    totals = counts.sum(axis=1, keepdims=True)
+    p = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+    logs = np.log2(p, out=np.zeros_like(p), where=p > 0)
+    return -(p * logs).sum(axis=1)
+
+
+def code_entropy(codes: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Entropy in bits of the codes in each row of a corpus × token matrix (only where `mask`)"""
+    n_rows = len(codes)
+    rows = np.broadcast_to(np.arange(n_rows, dtype=np.int64)[:, None], codes.shape)
+    if mask is not None:
+        rows, codes = rows[mask], codes[mask]
+    if not codes.size:
+        return np.zeros(n_rows)
+    # Pack (row, code) so one unique call counts every row
+    n_codes = int(codes.max()) + 1
+    packed, counts = np.unique(rows * n_codes + codes, return_counts=True)
+    row = packed // n_codes
+    n = np.bincount(row, weights=counts, minlength=n_rows)
+    c_log_c = np.bincount(row, weights=counts * np.log2(counts), minlength=n_rows)
+    return np.log2(n, out=np.zeros(n_rows), where=n > 0) - np.divide(c_log_c, n, out=np.zeros(n_rows), where=n > 0)
+
+
+def script_features(counts: FeatureCounts) -> Dict[str, np.ndarray]:
+    """Each feature for every row of a (weighted) FeatureCounts"""
+    n = counts.n_segments
+    mean = counts.length_sum / n
+    var = np.maximum(counts.length_sq / n - mean ** 2, 0.0)
+    unigrams = counts.unigrams
+    top = np.sort(unigrams, axis=1)[:, -TOP_SIGNS:].sum(axis=1)
+    return {
+        'seg_len_mean': mean,
+        'seg_len_cv': np.sqrt(var) / mean,
+        'max_seg_ratio': counts.length_max / mean,
+        'initial_entropy': entropy(counts.initials),
+        'final_entropy': entropy(counts.finals),
+        'bigram_entropy': entropy(counts.bigrams),
+        'freq_concentration': top / unigrams.sum(axis=1),
+    }
+
+
+def feature_matrix(features: Dict[str, np.ndarray], names: Sequence[str]) -> np.ndarray:
+    """corpus × names array (NaN for features not computed), e.g. for BayesModel.log_evidence"""
+    n = len(next(iter(features.values())))
+    return np.column_stack([np.asarray(features.get(name, np.full(n, np.nan)), dtype=np.float64)
+                            for name in names])
+
+
+def extract_features(tok: SegmentTokens) -> Dict[str, float]:
+    """FEATURES of the whole corpus plus the notebooks' descriptive statistics"""
+    counts = segment_counts(tok).total()
+    features = {name: float(values[0]) for name, values in script_features(counts).items()}
+    lengths = tok.lengths.astype(np.float64)
+    unigrams, bigrams = counts.unigrams[0], counts.bigrams[0]
+    sign_counts = unigrams[unigrams > 0]
+    std = float(lengths.std())
+    features.update({
+        'seg_len_std': std,
+        'seg_len_max': int(tok.lengths.max()),
+        'seg_len_skew': float(((lengths - lengths.mean()) ** 3).mean() / std ** 3) if std else math.nan,
+        'n_unique_initial': int((counts.initials[0] > 0).sum()),
+        'n_unique_final': int((counts.finals[0] > 0).sum()),
+        'bigram_types': int((bigrams > 0).sum()),
+        'top_10_concentration': (float(np.sort(bigrams)[-TOP_SIGNS:].sum() / bigrams.sum())
+                                 if bigrams.sum() else math.nan),
+        'n_sign_types': len(sign_counts),
+        'total_tokens': int(sign_counts.sum()),
+        'hapax_ratio': float((sign_counts == 1).mean()),
+    })
+    return features
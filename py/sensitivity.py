@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter Sensitivity Sweep
+================================
+Family ranking of bayes_engine.py across the hand-set hyperparameters of
+the Bayesian notebooks:
+
+    weight:<feature>      FEATURE_WEIGHTS entry
+    prior_std:<feature>   first element of FEATURE_UNCERTAINTIES
+    lik_std:<feature>     second element of FEATURE_UNCERTAINTIES
+    scaling_factor        observed seg_len_mean / 3.45
+
+Each parameter is a Parameter with a range around its notebook value
+(weights linear, standard deviations log-uniform). Configurations are
+rows of a configuration × parameter matrix, from a Latin hypercube or a
+two-parameter grid with everything else at the notebook values, and the
+evidence of every family under every configuration is one broadcast
+(configurations × families × features). A million configurations take a
+few seconds.
+
+The sweep records how often the ranking flips, i.e. another family beats
+the winner at the notebook values, overall and per parameter bin, so flip
+regions and the parameters that drive them can be reported:
+
+    result = latin_hypercube_sweep(model, observed, n_configs=1_000_000)
+    result.regions()
+"""
+
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bayes_engine import SCALED_FEATURE, BayesModel
+
+# Multiples of the notebook values spanned by default
+WEIGHT_RANGE = (0.0, 2.0)
+STD_RANGE = (0.5, 2.0)
+SCALING_RANGE = (0.5, 1.5)
+
+# Configurations evaluated per broadcast
+CHUNK = 250_000
+
+
+class Parameter(NamedTuple):
+    name: str
+    kind: str
+    feature: Optional[str]
+    low: float
+    high: float
+    log: bool
+    baseline: float
+
+    def value(self, unit: np.ndarray) -> np.ndarray:
+        """Parameter values at positions in [0, 1] of its range"""
+        if self.log:
+            return self.low * (self.high / self.low) ** unit
+        return self.low + unit * (self.high - self.low)
+
+    def unit(self, value: float) -> float:
+        """Position of a value in [0, 1] of the range"""
+        if self.log:
+            return float(np.log(value / self.low) / np.log(self.high / self.low))
+        return float((value - self.low) / (self.high - self.low))
+
+
+class FlipRegion(NamedTuple):
+    parameter: str
+    low: float
+    high: float
+    flip_rate: float
+
+    def __str__(self) -> str:
+        return f"{self.parameter:28s} in [{self.low:.3g}, {self.high:.3g}]: ranking flips in {self.flip_rate:.1%}"
+
+
+class SweepResult(NamedTuple):
+    """Winner counts of a sweep, overall and per parameter bin"""
+    families: List[str]
+    parameters: List[Parameter]
+    baseline: int
+    wins: np.ndarray
+    counts: np.ndarray
+    flips: np.ndarray
+
+    @property
+    def n_configs(self) -> int:
+        return int(self.wins.sum())
+
+    @property
+    def flip_rate(self) -> float:
+        """Share of configurations where the notebook winner is not the best family"""
+        return 1.0 - float(self.wins[self.baseline]) / self.n_configs
+
+    def win_rates(self) -> Dict[str, float]:
+        return {family: float(w) / self.n_configs for family, w in zip(self.families, self.wins)}
+
+    def bin_flip_rates(self) -> np.ndarray:
+        """parameter × bin share of configurations with a flipped ranking"""
+        return np.divide(self.flips, self.counts, out=np.zeros(self.flips.shape), where=self.counts > 0)
+
+    def influence(self) -> List[Tuple[str, float]]:
+        """(parameter, max - min flip rate over its bins), most influential first"""
+        rates = self.bin_flip_rates()
+        spread = rates.max(axis=1) - rates.min(axis=1)
+        return [(self.parameters[i].name, float(spread[i])) for i in np.argsort(-spread, kind='stable')]
+
+    def regions(self, threshold: float = 0.5) -> List[FlipRegion]:
+        """Ranges of single parameters (adjacent bins merged) where the flip rate exceeds `threshold`"""
+        rates = self.bin_flip_rates()
+        n_bins = rates.shape[1]
+        out = []
+        for p, parameter in enumerate(self.parameters):
+            hot = np.concatenate([[False], rates[p] > threshold, [False]])
+            starts = np.flatnonzero(hot[1:] & ~hot[:-1])
+            stops = np.flatnonzero(~hot[1:] & hot[:-1])
+            for a, b in zip(starts, stops):
+                edges = parameter.value(np.array([a, b]) / n_bins)
+                rate = self.flips[p, a:b].sum() / max(self.counts[p, a:b].sum(), 1)
+                out.append(FlipRegion(parameter.name, float(edges[0]), float(edges[1]), float(rate)))
+        return out
+
+
+class GridMap(NamedTuple):
+    """Evidence over a two-parameter grid, the other parameters at their notebook values"""
+    x: Parameter
+    y: Parameter
+    x_values: np.ndarray
+    y_values: np.ndarray
+    log_bf: np.ndarray
+    winner: np.ndarray
+
+
+def parameter_space(model: BayesModel, observed: Mapping[str, float],
+                    weight_range: Tuple[float, float] = WEIGHT_RANGE,
+                    std_range: Tuple[float, float] = STD_RANGE,
+                    scaling_range: Tuple[float, float] = SCALING_RANGE) -> List[Parameter]:
+    """Every sweepable hyperparameter of a model, ranges as multiples of the model's values"""
+    out = []
+    for k, feature in enumerate(model.features):
+        w = float(model.weights[k])
+        out.append(Parameter(f'weight:{feature}', 'weight', feature,
+                             weight_range[0] * w, weight_range[1] * w, False, w))
+    for kind, values in (('prior_std', model.feature_prior_std), ('lik_std', model.lik_std)):
+        for k, feature in enumerate(model.features):
+            sd = float(values[k])
+            out.append(Parameter(f'{kind}:{feature}', kind, feature,
+                                 std_range[0] * sd, std_range[1] * sd, True, sd))
+    if SCALED_FEATURE in model.features:
+        obs = model.observation_matrix(observed)
+        scaling = float(model.scaling_factors(obs)[0])
+        out.append(Parameter('scaling_factor', 'scaling', None,
+                             scaling_range[0] * scaling, scaling_range[1] * scaling, False, scaling))
+    return out
+
+
+def sweep_log_evidence(model: BayesModel, observed: Mapping[str, float],
+                       parameters: Sequence[Parameter], values: np.ndarray) -> np.ndarray:
+    """configuration × family log evidence with each column of `values` set as its parameter"""
+    obs = model.observation_matrix(observed)[0]
+    n, n_feat = len(values), len(model.features)
+    weights = np.tile(model.weights, (n, 1))
+    prior_std = np.tile(model.feature_prior_std, (n, 1))
+    lik_std = np.tile(model.lik_std, (n, 1))
+    # Multiplier of each prior mean (only the scaled feature's varies)
+    factor = np.ones((n, n_feat))
+    if SCALED_FEATURE in model.features:
+        factor[:, model.features.index(SCALED_FEATURE)] = model.scaling_factors(obs[None, :])[0]
+
+    columns = {'weight': weights, 'prior_std': prior_std, 'lik_std': lik_std}
+    for j, parameter in enumerate(parameters):
+        if parameter.kind == 'scaling':
+            factor[:, model.features.index(SCALED_FEATURE)] = values[:, j]
+        else:
+            columns[parameter.kind][:, model.features.index(parameter.feature)] = values[:, j]
+
+    total_var = (np.square(prior_std)[:, None, :] + np.square(model.family_prior_sd)[None]
+                 + np.square(lik_std)[:, None, :])
+    means = model.means[None] * factor[:, None, :]
+    log_e = -0.5 * np.log(2 * np.pi * total_var) - 0.5 * np.square(obs - means) / total_var
+    return np.nansum(log_e * weights[:, None, :], axis=-1)
+
+
+def latin_hypercube(n: int, n_dims: int, rng: np.random.Generator) -> np.ndarray:
+    """n × n_dims points in [0, 1), one per stratum 1/n of every dimension"""
+    strata = rng.permuted(np.tile(np.arange(n), (n_dims, 1)), axis=1).T
+    return (strata + rng.random((n, n_dims))) / n
+
+
+def latin_hypercube_sweep(model: BayesModel, observed: Mapping[str, float], n_configs: int = 1_000_000,
+                          parameters: Optional[Sequence[Parameter]] = None, bins: int = 10,
+                          seed: Optional[int] = 0) -> SweepResult:
+    """Winner counts over a Latin hypercube of the parameters (each chunk is its own hypercube)"""
+    parameters = list(parameters or parameter_space(model, observed))
+    rng = np.random.default_rng(seed)
+    baseline = int(np.argmax(model.log_evidence(observed)[0]))
+    n_params, n_fam = len(parameters), len(model.families)
+
+    wins = np.zeros(n_fam, dtype=np.int64)
+    counts = np.zeros((n_params, bins), dtype=np.int64)
+    flips = np.zeros((n_params, bins), dtype=np.int64)
+    for start in range(0, n_configs, CHUNK):
+        unit = latin_hypercube(min(CHUNK, n_configs - start), n_params, rng)
+        values = np.column_stack([p.value(unit[:, j]) for j, p in enumerate(parameters)])
+        winner = sweep_log_evidence(model, observed, parameters, values).argmax(axis=1)
+        flipped = winner != baseline
+        wins += np.bincount(winner, minlength=n_fam)
+        # Bin of every configuration on every parameter axis, offset per parameter
+        cells = (np.minimum((unit * bins).astype(np.int64), bins - 1)
+                 + np.arange(n_params)[None, :] * bins)
+        counts += np.bincount(cells.ravel(), minlength=n_params * bins).reshape(n_params, bins)
+        flips += np.bincount(cells[flipped].ravel(), minlength=n_params * bins).reshape(n_params, bins)
+    return SweepResult(model.families, parameters, baseline, wins, counts, flips)
+
+
+def grid_map(model: BayesModel, observed: Mapping[str, float], x: Parameter, y: Parameter,
+             n: int = 101) -> GridMap:
+    """log BF of the notebook winner against the best other family over an n × n grid of x and y"""
+    x_values = x.value(np.linspace(0, 1, n))
+    y_values = y.value(np.linspace(0, 1, n))
+    xx, yy = np.meshgrid(x_values, y_values)
+    totals = sweep_log_evidence(model, observed, [x, y], np.column_stack([xx.ravel(), yy.ravel()]))
+    baseline = int(np.argmax(model.log_evidence(observed)[0]))
+    others = np.delete(totals, baseline, axis=1)
+    log_bf = totals[:, baseline] - others.max(axis=1) if others.shape[1] else np.zeros(len(totals))
+    return GridMap(x, y, x_values, y_values, log_bf.reshape(n, n), totals.argmax(axis=1).reshape(n, n))
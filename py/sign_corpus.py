@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Sign Corpus
+===========
+data/sign_sequences.csv loaded once into integer arrays, one entry per
+token in corpus order:
+
+    sign       sign ID (index into `signs`; -1 for eroded tokens)
+    segment    segment ID (index into `segments`)
+    position   0-based position within the segment
+    eroded     True for illegible tokens (ERODED_* in the file)
+    boundary   True for MS20 tokens
+    text       text ID (index into `texts`)
+
+Segments are those numbered in the file: runs of a column closed by MS20,
+or the end of the column. `segment_tokens()` drops the MS20 tokens and
+marks the segments they closed, giving the SegmentTokens from which
+script_features.py computes every feature with bincounts over segment
+offsets. Subsets of texts or of MS20-closed segments are masks on the
+same arrays, so corpus variants are cheap:
+
+    corpus = SignCorpus.load()
+    corpus.features()
+    corpus.features(texts=['LM'])
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from script_features import (BOUNDARY_SIGN, FeatureCounts, SegmentTokens, extract_features,
+                             segment_counts)
+
+SIGN_SEQUENCES = os.path.join('data', 'sign_sequences.csv')
+
+
+class SignCorpus:
+    """Token-level integer arrays of the Isthmian sign sequences"""
+
+    def __init__(self, signs: Sequence[str], segments: Sequence[str], texts: Sequence[str],
+                 sign: np.ndarray, segment: np.ndarray, position: np.ndarray,
+                 eroded: np.ndarray, boundary: np.ndarray, text: np.ndarray):
+        self.signs = list(signs)
+        self.segments = list(segments)
+        self.texts = list(texts)
+        self.sign = sign
+        self.segment = segment
+        self.position = position
+        self.eroded = eroded
+        self.boundary = boundary
+        self.text = text
+        if np.any(np.diff(segment) < 0):
+            raise ValueError("tokens of a segment must be contiguous and segments in order")
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(segment, minlength=len(self.segments)))])
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'SignCorpus':
+        """Corpus from a table in the sign_sequences.csv layout"""
+        df = df.sort_values('token_id', kind='stable')
+        eroded = df['is_eroded'].to_numpy().astype(bool)
+        boundary = df['is_boundary_MS20'].to_numpy().astype(bool)
+        tokens = df['sign_token'].astype(str).to_numpy()
+
+        signs, codes = np.unique(np.append(tokens[~eroded], BOUNDARY_SIGN), return_inverse=True)
+        sign = np.full(len(df), -1, dtype=np.int64)
+        sign[~eroded] = codes[:-1]
+        # Segment and text IDs in order of first appearance
+        segments, segment = _first_seen(df['segment_id'].astype(str).to_numpy())
+        texts, text = _first_seen(df['text_id'].astype(str).to_numpy())
+        return cls(signs, segments, texts, sign, segment, df['position_in_segment'].to_numpy() - 1,
+                   eroded, boundary, text)
+
+    @classmethod
+    def load(cls, path: str = SIGN_SEQUENCES) -> 'SignCorpus':
+        return cls.from_frame(pd.read_csv(path))
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self.sign)
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.segments)
+
+    def segment_text(self) -> np.ndarray:
+        """Text ID of each segment"""
+        return self.text[self.offsets[:-1]]
+
+    def segment_mask(self, texts: Optional[Sequence[str]] = None, bounded_only: bool = False) -> np.ndarray:
+        """Segments of the given texts (all by default), optionally only those closed by MS20"""
+        keep = np.ones(self.n_segments, dtype=bool)
+        if texts is not None:
+            keep &= np.isin(self.segment_text(), [self.texts.index(t) for t in texts])
+        if bounded_only:
+            keep &= np.bincount(self.segment[self.boundary], minlength=self.n_segments) > 0
+        return keep
+
+    def segment_tokens(self, texts: Optional[Sequence[str]] = None,
+                       bounded_only: bool = False) -> SegmentTokens:
+        """SegmentTokens of the selected segments, with MS20 tokens turned into segment endings"""
+        keep_segment = self.segment_mask(texts, bounded_only)
+        # Renumber the kept segments 0..n-1
+        new_id = np.cumsum(keep_segment) - 1
+        keep = keep_segment[self.segment] & ~self.boundary
+        segment = new_id[self.segment[keep]]
+        n = int(keep_segment.sum())
+        ending = np.bincount(self.segment[self.boundary], minlength=self.n_segments)[keep_segment] > 0
+        lengths = np.bincount(segment, minlength=n)
+        return SegmentTokens(self.signs, self.sign[keep], segment, self.eroded[keep],
+                             np.concatenate([[0], np.cumsum(lengths)]), ending,
+                             self.texts, self.segment_text()[keep_segment])
+
+    def counts(self, texts: Optional[Sequence[str]] = None, bounded_only: bool = False) -> FeatureCounts:
+        """Per-segment FeatureCounts of the selected segments"""
+        return segment_counts(self.segment_tokens(texts, bounded_only))
+
+    def features(self, texts: Optional[Sequence[str]] = None, bounded_only: bool = False) -> Dict[str, float]:
+        """Script features of the selected segments"""
+        return extract_features(self.segment_tokens(texts, bounded_only))
+
+    def text_summary(self) -> pd.DataFrame:
+        """Tokens, segments, MS20 boundaries and eroded tokens of each text"""
+        seg_text = self.segment_text()
+        return pd.DataFrame({
+            'text_id': self.texts,
+            'tokens': np.bincount(self.text, minlength=len(self.texts)),
+            'segments': np.bincount(seg_text, minlength=len(self.texts)),
+            'ms20': np.bincount(self.text[self.boundary], minlength=len(self.texts)),
+            'eroded': np.bincount(self.text[self.eroded], minlength=len(self.texts)),
+        })
+
+
+def _first_seen(values: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """Distinct values in order of first appearance, and each value's index among them"""
+    distinct, first, inverse = np.unique(values, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return [str(v) for v in distinct[order]], rank[inverse]
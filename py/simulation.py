@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Synthetic-Corpus Power Analysis
+===============================
+How often the Bayesian comparison (bayes_engine.py) picks the right family
+when a corpus of the Isthmian size really comes from that family.
+
+Each family's PHONOTACTIC_PRIORS entry is turned into a generative sign
+model (FamilyModel) with five parameters:
+
+    signs              Zipf frequencies over n_signs signs (exponent)
+    initials, finals   Zipf frequencies over the same sign ranking, each
+                       with its own exponent
+    sequence           within a segment, each sign after the initial either
+                       follows the fixed successor of the previous sign or is
+                       a fresh draw (repeat rate)
+    segment lengths    gamma-weighted shares of the corpus (CV of the shares)
+
+The parameters are calibrated jointly against the features of simulated
+corpora of the Isthmian size, not against closed-form expectations: the
+positional draws and the successor chain shift the sign frequencies, and
+plug-in entropies of a few hundred tokens are biased low. Starting from the
+closed-form fit, each parameter is bisected in turn so that the mean
+simulated value of its feature meets the prior, with the others held and
+every batch on the same random numbers, until a sweep changes nothing:
+
+    exponent           freq_concentration
+    initial_exponent   initial_entropy
+    final_exponent     final_entropy
+    repeat             bigram_entropy
+    length_cv          seg_len_cv
+
+Repeating successors also concentrates the sign frequencies, so the repeat
+rate is capped where freq_concentration would become unreachable (with a
+uniform unigram): a bigram entropy below what the concentration allows is
+missed, rather than traded against every other feature. max_seg_ratio has
+no parameter of its own. FamilyModel.target and .realized record the prior
+and the mean simulated value of every fitted feature (not seg_len_mean,
+which is fixed by the corpus size), and unmatched() lists the targets the
+model misses.
+
+Some priors cannot be met together by any generator. The plug-in bigram
+entropy of a corpus is at least the entropy of its sign frequencies, and
+freq_concentration bounds that from below: with the top ten signs
+(MS20 included) holding 35% of the tokens, the rest is spread over at
+least twenty more, about 4.9 bits, above a bigram_entropy prior of 4.5.
+Corpora generated for such a family are not draws from its prior on those
+features, so simulate() leaves every feature that some generator misses
+out of the scoring (unmatched_features()); the identification rates rest
+on the matched features only.
+
+A synthetic corpus has `n_tokens` tokens, `n_boundaries` of which are MS20
+closing one segment each (576 and 45 in data/sign_sequences.csv). Corpora
+are generated as corpus × token arrays in batches, featurised with the
+same bincount code as the real corpus and scored in one call; batches
+run in a process pool (about 0.1 ms per corpus and core). Mean segment length
+is fixed by the corpus size, so seg_len_mean carries the same information
+for every true family, as it does for the real data.
+
+    models = family_models(PHONOTACTIC_PRIORS)
+    power_curve(model, models, sizes=[144, 288, 576, 1152])
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bayes_engine import BayesModel
+from script_features import TOP_SIGNS, code_entropy, feature_matrix
+
+ISTHMIAN_TOKENS = 576
+ISTHMIAN_BOUNDARIES = 45
+# Distinct legible signs other than MS20 in data/sign_sequences.csv
+ISTHMIAN_SIGNS = 172
+
+# Corpora generated per batch (one pool task)
+BATCH = 5000
+
+# Below this many corpora a pool costs more than it saves
+MIN_PARALLEL_CORPORA = 20_000
+
+# Calibration: corpora per evaluation, bisection steps, maximum sweeps
+CALIBRATION_CORPORA = 200
+CALIBRATION_STEPS = 16
+CALIBRATION_SWEEPS = 6
+
+# (parameter, feature it is fitted to, range)
+PARAMETERS = (
+    ('exponent', 'freq_concentration', (0.0, 4.0)),
+    ('initial_exponent', 'initial_entropy', (0.0, 12.0)),
+    ('final_exponent', 'final_entropy', (0.0, 12.0)),
+    ('repeat', 'bigram_entropy', (0.0, 1.0)),
+    ('length_cv', 'seg_len_cv', (1e-3, 3.0)),
+)
+
+# Largest gap between the mean simulated feature and the prior that
+# counts as a match (a quarter of the likelihood SDs of the notebook's
+# FEATURE_UNCERTAINTIES)
+MATCH_TOLERANCE = {
+    'seg_len_cv': 0.025,
+    'max_seg_ratio': 0.075,
+    'initial_entropy': 0.075,
+    'final_entropy': 0.075,
+    'bigram_entropy': 0.125,
+    'freq_concentration': 0.02,
+}
+
+_worker_state: Optional[Tuple[BayesModel, Dict[str, 'FamilyModel'], List[str]]] = None
+
+
+class FamilyModel(NamedTuple):
+    """Generative sign model of one family, with its prior and mean simulated features"""
+    family: str
+    unigram: np.ndarray
+    initial: np.ndarray
+    final: np.ndarray
+    successor: np.ndarray
+    repeat: float
+    length_cv: float
+    target: Dict[str, float] = {}
+    realized: Dict[str, float] = {}
+
+    def gaps(self) -> Dict[str, float]:
+        """Mean simulated minus prior value of each fitted feature"""
+        return {f: self.realized[f] - self.target[f] for f in self.target if f in self.realized}
+
+    def unmatched(self, tolerance: Optional[Mapping[str, float]] = None) -> List[str]:
+        """Features whose mean simulated value misses the prior by more than their tolerance"""
+        tolerance = tolerance or MATCH_TOLERANCE
+        return [f for f, gap in self.gaps().items() if abs(gap) > tolerance[f]]
+
+
+class SimulationResult(NamedTuple):
+    """Winners of the comparison over corpora generated from one family"""
+    family: str
+    n_tokens: int
+    n_boundaries: int
+    families: List[str]
+    wins: np.ndarray
+    features: List[str]  # features the comparison was scored on
+
+    @property
+    def n_corpora(self) -> int:
+        return int(self.wins.sum())
+
+    @property
+    def identification_rate(self) -> float:
+        """Share of corpora whose best family is the generating one"""
+        return float(self.wins[self.families.index(self.family)]) / self.n_corpora
+
+    def win_rates(self) -> Dict[str, float]:
+        return {family: float(w) / self.n_corpora for family, w in zip(self.families, self.wins)}
+
+
+def _entropy(p: np.ndarray) -> float:
+    p = p[p > 0]
+    return float(-(p * np.log2(p)).sum())
+
+
+def _bisect(fn, target: float, low: float, high: float, steps: int = 60) -> float:
+    """Argument in [low, high] where the monotone `fn` is closest to `target`"""
+    increasing = fn(high) > fn(low)
+    for _ in range(steps):
+        mid = (low + high) / 2
+        if (fn(mid) < target) == increasing:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def _tempered(p: np.ndarray, power: float) -> np.ndarray:
+    q = p ** power
+    return q / q.sum()
+
+
+def _bigram_entropy(p: np.ndarray, successor: np.ndarray, repeat: float) -> float:
+    """Entropy of consecutive signs under the repeat-or-draw chain (signs drawn from p)"""
+    rows = (1 - repeat) * p[None, :] + repeat * np.eye(len(p))[successor]
+    joint = p[:, None] * rows
+    return _entropy(joint.ravel())
+
+
+def _zipf(n_signs: int, exponent: float) -> np.ndarray:
+    return _tempered(1 / np.arange(1, n_signs + 1, dtype=np.float64), exponent)
+
+
+def _build(family: str, params: Mapping[str, float], successor: np.ndarray) -> FamilyModel:
+    n = len(successor)
+    return FamilyModel(family, _zipf(n, params['exponent']), _zipf(n, params['initial_exponent']),
+                       _zipf(n, params['final_exponent']), successor, params['repeat'], params['length_cv'])
+
+
+def _closed_form(prior: Mapping[str, float], n_signs: int, n_tokens: int, n_boundaries: int,
+                 successor: np.ndarray) -> Dict[str, float]:
+    """Parameters matching the prior in expectation over an infinite corpus (calibration start)"""
+    content = n_tokens - n_boundaries
+
+    def concentration(exponent):
+        counts = np.append(content * _zipf(n_signs, exponent), n_boundaries)
+        return np.sort(counts)[-TOP_SIGNS:].sum() / n_tokens
+
+    params = {'exponent': _bisect(concentration, prior.get('freq_concentration', 0.3), 0.0, 4.0),
+              'repeat': 0.0, 'length_cv': prior.get('seg_len_cv', 0.5)}
+    for name, feature in (('initial_exponent', 'initial_entropy'), ('final_exponent', 'final_entropy')):
+        params[name] = params['exponent']
+        if feature in prior:
+            params[name] = _bisect(lambda b: _entropy(_zipf(n_signs, b)), prior[feature], 0.0, 12.0)
+    if 'bigram_entropy' in prior:
+        params['repeat'] = _bisect(lambda r: _bigram_entropy(_zipf(n_signs, params['exponent']), successor, r),
+                                   prior['bigram_entropy'], 0.0, 1.0)
+    return params
+
+
+def mean_features(fm: FamilyModel, n_corpora: int = 1000, n_tokens: int = ISTHMIAN_TOKENS,
+                  n_boundaries: int = ISTHMIAN_BOUNDARIES, seed: Optional[int] = 0) -> Dict[str, float]:
+    """Mean features of `n_corpora` corpora generated from a FamilyModel"""
+    signs, lengths = generate(fm, n_corpora, n_tokens, n_boundaries, np.random.default_rng(seed))
+    features = corpus_features(signs, lengths, len(fm.unigram))
+    return {name: float(np.mean(values)) for name, values in features.items()}
+
+
+def family_model(family: str, prior: Mapping[str, float], n_signs: int = ISTHMIAN_SIGNS,
+                 n_tokens: int = ISTHMIAN_TOKENS, n_boundaries: int = ISTHMIAN_BOUNDARIES,
+                 seed: Optional[int] = 0) -> FamilyModel:
+    """FamilyModel whose simulated corpora match one family's prior on average (as far as it can)"""
+    rng = np.random.default_rng(seed)
+    successor = rng.permutation(n_signs)
+    # One seed for every calibration batch (common random numbers)
+    batch_seed = int(rng.integers(2 ** 32))
+
+    def realized(params, **changes):
+        return mean_features(_build(family, dict(params, **changes), successor), CALIBRATION_CORPORA,
+                             n_tokens, n_boundaries, batch_seed)
+
+    params = _closed_form(prior, n_signs, n_tokens, n_boundaries, successor)
+    for _ in range(CALIBRATION_SWEEPS):
+        previous = dict(params)
+        for name, feature, (low, high) in PARAMETERS:
+            if feature not in prior:
+                continue
+            if name == 'repeat' and 'freq_concentration' in prior:
+                # Highest repeat rate at which a uniform unigram still gets down to freq_concentration
+                least = lambda r: realized(params, exponent=0.0, repeat=r)['freq_concentration']
+                if least(high) > prior['freq_concentration']:
+                    high = _bisect(least, prior['freq_concentration'], low, high, CALIBRATION_STEPS)
+            params[name] = _bisect(lambda v: realized(params, **{name: v})[feature],
+                                   prior[feature], low, high, CALIBRATION_STEPS)
+        if all(abs(params[name] - previous[name]) <= 1e-3 * (high - low) for name, _, (low, high) in PARAMETERS):
+            break
+
+    # Fit checked on fresh corpora, not the calibration batch
+    fm = _build(family, params, successor)
+    check = mean_features(fm, 5 * CALIBRATION_CORPORA, n_tokens, n_boundaries, batch_seed + 1)
+    target = {f: float(prior[f]) for f in MATCH_TOLERANCE if f in prior}
+    return fm._replace(target=target, realized={f: check[f] for f in target})
+
+
+def family_models(priors: Mapping[str, Mapping[str, float]], **kwargs) -> Dict[str, FamilyModel]:
+    """FamilyModel of every family in a PHONOTACTIC_PRIORS table"""
+    return {family: family_model(family, prior, **kwargs) for family, prior in priors.items()}
+
+
+def unmatched_features(models: Mapping[str, FamilyModel],
+                       tolerance: Optional[Mapping[str, float]] = None) -> List[str]:
+    """Features that at least one FamilyModel misses (left out of simulate()'s scoring)"""
+    missed = {feature for fm in models.values() for feature in fm.unmatched(tolerance)}
+    return [feature for feature in MATCH_TOLERANCE if feature in missed]
+
+
+def _draw(rng: np.random.Generator, p: np.ndarray, shape) -> np.ndarray:
+    """Signs drawn from p by inverse CDF"""
+    cdf = np.cumsum(p)
+    return np.minimum(np.searchsorted(cdf, rng.random(shape) * cdf[-1]), len(p) - 1)
+
+
+def generate(fm: FamilyModel, n_corpora: int, n_tokens: int = ISTHMIAN_TOKENS,
+             n_boundaries: int = ISTHMIAN_BOUNDARIES,
+             rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(corpus × sign matrix without MS20, corpus × segment lengths) of synthetic corpora"""
+    rng = rng or np.random.default_rng()
+    n_seg = n_boundaries
+    content = n_tokens - n_boundaries
+    if n_seg < 1 or content < n_seg:
+        raise ValueError("need at least one boundary and one sign per segment")
+
+    # Every segment gets one sign, the rest is split by gamma weights
+    shape = 1 / max(fm.length_cv, 1e-3) ** 2
+    share = rng.gamma(shape, size=(n_corpora, n_seg))
+    lengths = 1 + rng.multinomial(content - n_seg, share / share.sum(axis=1, keepdims=True))
+
+    ends = np.cumsum(lengths, axis=1) - 1
+    starts = ends - lengths + 1
+    signs = _draw(rng, fm.unigram, (n_corpora, content))
+    np.put_along_axis(signs, starts, _draw(rng, fm.initial, starts.shape), axis=1)
+    # Each segment starts from its initial sign; later signs repeat the
+    # successor of the previous one or keep their fresh draw
+    repeat = rng.random((n_corpora, content)) < fm.repeat
+    np.put_along_axis(repeat, starts, False, axis=1)
+    for t in range(1, content):
+        signs[:, t] = np.where(repeat[:, t], fm.successor[signs[:, t - 1]], signs[:, t])
+    np.put_along_axis(signs, ends, _draw(rng, fm.final, ends.shape), axis=1)
+    return signs, lengths
+
+
+def corpus_features(signs: np.ndarray, lengths: np.ndarray, n_signs: int) -> Dict[str, np.ndarray]:
+    """Script features of each synthetic corpus (every segment closed by MS20)"""
+    n_corpora, content = signs.shape
+    ends = np.cumsum(lengths, axis=1) - 1
+    starts = ends - lengths + 1
+    mean = lengths.mean(axis=1)
+
+    # Pairs across a segment start are not bigrams
+    within = np.ones((n_corpora, content - 1), dtype=bool)
+    np.put_along_axis(within, starts[:, 1:] - 1, False, axis=1)
+    bigrams = signs[:, :-1] * n_signs + signs[:, 1:]
+
+    rows = np.arange(n_corpora)[:, None]
+    unigrams = np.bincount((rows * n_signs + signs).ravel(), minlength=n_corpora * n_signs)
+    unigrams = np.column_stack([unigrams.reshape(n_corpora, n_signs), np.full(n_corpora, lengths.shape[1])])
+    top = np.sort(unigrams, axis=1)[:, -TOP_SIGNS:].sum(axis=1)
+    return {
+        'seg_len_mean': mean,
+        'seg_len_cv': lengths.std(axis=1) / mean,
+        'max_seg_ratio': lengths.max(axis=1) / mean,
+        'initial_entropy': code_entropy(np.take_along_axis(signs, starts, axis=1)),
+        'final_entropy': code_entropy(np.take_along_axis(signs, ends, axis=1)),
+        'bigram_entropy': code_entropy(bigrams, within),
+        'freq_concentration': top / unigrams.sum(axis=1),
+    }
+
+
+def _run_batch(model: BayesModel, fm: FamilyModel, n_corpora: int, n_tokens: int,
+               n_boundaries: int, seed: np.random.SeedSequence, scored: Sequence[str]) -> np.ndarray:
+    """Win counts of each model family over one batch (features not in `scored` are skipped)"""
+    signs, lengths = generate(fm, n_corpora, n_tokens, n_boundaries, np.random.default_rng(seed))
+    features = corpus_features(signs, lengths, len(fm.unigram))
+    features = {name: values for name, values in features.items() if name in scored}
+    winners = model.log_evidence(feature_matrix(features, model.features)).argmax(axis=1)
+    return np.bincount(winners, minlength=len(model.families))
+
+
+def _init_worker(model: BayesModel, models: Dict[str, FamilyModel], scored: List[str]):
+    global _worker_state
+    _worker_state = (model, models, scored)
+
+
+def _batch_task(task: Tuple[str, int, int, int, np.random.SeedSequence]) -> np.ndarray:
+    family, n, n_tokens, n_boundaries, seed = task
+    model, models, scored = _worker_state
+    return _run_batch(model, models[family], n, n_tokens, n_boundaries, seed, scored)
+
+
+def simulate(model: BayesModel, models: Mapping[str, FamilyModel], n_corpora: int = 100_000,
+             sizes: Sequence[Tuple[int, int]] = ((ISTHMIAN_TOKENS, ISTHMIAN_BOUNDARIES),),
+             seed: Optional[int] = 0, workers: Optional[int] = None,
+             features: Optional[Sequence[str]] = None) -> List[SimulationResult]:
+    """
+    Identification results of `n_corpora` corpora per family and
+    (n_tokens, n_boundaries) size, scored on `features` (by default every
+    model feature the generators match)
+    """
+    if features is None:
+        dropped = unmatched_features(models)
+        features = [feature for feature in model.features if feature not in dropped]
+    scored = list(features)
+    keys = [(family, size) for size in sizes for family in models]
+    tasks = []
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(keys) * -(-n_corpora // BATCH)))
+    for k, (family, (n_tokens, n_boundaries)) in enumerate(keys):
+        for start in range(0, n_corpora, BATCH):
+            tasks.append((k, (family, min(BATCH, n_corpora - start), n_tokens, n_boundaries, next(seeds))))
+
+    wins = np.zeros((len(keys), len(model.families)), dtype=np.int64)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or n_corpora * len(keys) < MIN_PARALLEL_CORPORA:
+        _init_worker(model, dict(models), scored)
+        for k, task in tasks:
+            wins[k] += _batch_task(task)
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model, dict(models), scored)) as pool:
+            for (k, _), batch in zip(tasks, pool.map(_batch_task, [task for _, task in tasks])):
+                wins[k] += batch
+    return [SimulationResult(family, n_tokens, n_boundaries, model.families, wins[k], scored)
+            for k, (family, (n_tokens, n_boundaries)) in enumerate(keys)]
+
+
+def power_curve(model: BayesModel, models: Mapping[str, FamilyModel], sizes: Sequence[int],
+                n_corpora: int = 100_000, boundary_rate: float = ISTHMIAN_BOUNDARIES / ISTHMIAN_TOKENS,
+                seed: Optional[int] = 0, workers: Optional[int] = None,
+                features: Optional[Sequence[str]] = None) -> List[SimulationResult]:
+    """Identification results by corpus size in tokens, MS20 boundaries at the Isthmian rate"""
+    pairs = [(int(n), max(1, int(round(n * boundary_rate)))) for n in sizes]
+    return simulate(model, models, n_corpora, pairs, seed, workers, features)